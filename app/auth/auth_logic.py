@@ -1,26 +1,46 @@
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from ..database import run_db
 from .models import User
+from .password_pool import password_pool
 from .schemas import UserCreate
-from .utils import verify_password, get_password_hash
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def register_user(db: Session, user: UserCreate):
+def add_user(db: Session, db_user: User):
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+    return db_user
+
+
+def get_user_by_username(db: Session, username: str):
+    return db.query(User).filter(User.username == username).first()
+
+
+async def register_user(db: Session, user: UserCreate):
     db_user = User(
         email=user.email,
         username=user.username,
-        hashed_password=get_password_hash(user.password),
+        hashed_password=await password_pool.hash(user.password),
     )
-    db.add(db_user)
+    return await run_db(db, add_user, db_user)
+
+
+def update_password_hash(db: Session, user: User, hashed_password: str):
+    user.hashed_password = hashed_password
     db.commit()
-    db.refresh(db_user)
-    return db_user
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(User).filter(User.username == username).first()
-    if user and verify_password(password, user.hashed_password):
-        return user
-    return None
+async def authenticate_user(db: Session, username: str, password: str):
+    user = await run_db(db, get_user_by_username, username)
+    if user is None:
+        return None
+    valid, new_hash = await password_pool.verify_and_update(password, user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        # Stored below the current cost: rewrite it while the plain password is at hand.
+        await run_db(db, update_password_hash, user, new_hash)
+    return user
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+
+from ..metrics import Counter, Gauge, Histogram
+from .utils import (
+    BCRYPT_MAX_ROUNDS, BCRYPT_MIN_ROUNDS, BCRYPT_ROUNDS, PASSWORD_HASH_TARGET_MS,
+    calibrate_bcrypt_rounds, get_password_hash, verify_and_update, verify_password,
+)
+
+load_dotenv()
+
+# bcrypt releases the GIL, so threads already spread the work across cores;
+# "process" isolates it completely from the worker serving requests.
+PASSWORD_POOL_KIND = os.getenv("PASSWORD_POOL_KIND", "thread").lower()
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", os.cpu_count() or 1))
+PASSWORD_POOL_QUEUE_SIZE = int(os.getenv("PASSWORD_POOL_QUEUE_SIZE", 32))
+PASSWORD_POOL_RETRY_AFTER = int(os.getenv("PASSWORD_POOL_RETRY_AFTER", 1))
+
+password_queue_depth = Gauge(
+    "password_pool_queue_depth", "Password operations waiting for a pool worker"
+)
+password_in_flight = Gauge(
+    "password_pool_in_flight", "Password operations submitted to the pool"
+)
+password_rejected = Counter(
+    "password_pool_rejected_total", "Password operations rejected with 503", ["op"]
+)
+password_latency = Histogram(
+    "password_hash_seconds", "Time spent hashing or verifying a password", ["op"]
+)
+password_rounds = Gauge("password_hash_rounds", "bcrypt cost used for new password hashes")
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordPool:
+    def __init__(self, kind: str, workers: int, queue_size: int, retry_after: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = workers + queue_size
+        self.retry_after = retry_after
+        # bcrypt cost for new hashes, passed along because process workers do
+        # not share this process' settings; None until calibrate() ran.
+        self.rounds = None
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            pool_class = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+            self._executor = pool_class(max_workers=self.workers)
+        return self._executor
+
+    def _acquire(self, op: str):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                password_rejected.inc(op=op)
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many concurrent authentication requests",
+                    headers={"Retry-After": str(self.retry_after)},
+                )
+            self._pending += 1
+            self._publish()
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+            self._publish()
+
+    def _publish(self):
+        password_in_flight.set(self._pending)
+        password_queue_depth.set(max(self._pending - self.workers, 0))
+
+    async def run(self, op: str, fn, *args):
+        self._acquire(op)
+        try:
+            loop = asyncio.get_running_loop()
+            result, elapsed = await loop.run_in_executor(self.executor, _timed, fn, *args)
+        finally:
+            self._release()
+        password_latency.observe(elapsed, op=op)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self.run("hash", get_password_hash, password, self.rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run("verify", verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str):
+        return await self.run("verify", verify_and_update, plain_password, hashed_password, self.rounds)
+
+    async def calibrate(self):
+        """Pick the bcrypt cost on startup, unless BCRYPT_ROUNDS pins it."""
+        self.rounds = BCRYPT_ROUNDS or await asyncio.get_running_loop().run_in_executor(
+            None, calibrate_bcrypt_rounds, PASSWORD_HASH_TARGET_MS, BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS
+        )
+        password_rounds.set(self.rounds)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_pool = PasswordPool(
+    PASSWORD_POOL_KIND, PASSWORD_POOL_WORKERS, PASSWORD_POOL_QUEUE_SIZE, PASSWORD_POOL_RETRY_AFTER
+)
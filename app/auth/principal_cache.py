@@ -0,0 +1,65 @@
+import os
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from ..cache import CacheBackend, build_backend
+from .models import User
+
+load_dotenv()
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 4096))
+
+
+class PrincipalCache:
+    """Authenticated users by token subject, never outliving the token itself."""
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    def get(self, username: str):
+        data = self.backend.get(username)
+        if data is None:
+            return None
+        return User(**data)
+
+    def put(self, user: User, expires_at: float | None = None):
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = min(ttl, expires_at - time.time())
+        data = {"id": user.id, "username": user.username, "email": user.email}
+        self.backend.set(user.username, data, ttl)
+
+    def invalidate(self, username: str):
+        self.backend.delete(username)
+
+
+principal_cache = PrincipalCache(
+    build_backend("principal:", PRINCIPAL_CACHE_SIZE), PRINCIPAL_CACHE_TTL
+)
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def collect_principal(mapper, connection, target):
+    # Flushed but not committed yet: drop the entries once the commit lands, so
+    # a concurrent lookup cannot cache the old row again in between.
+    changed = object_session(target).info.setdefault("changed_principals", set())
+    changed.add(target.username)
+    changed.update(inspect(target).attrs.username.history.deleted)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_principals(session):
+    for username in session.info.pop("changed_principals", ()):
+        principal_cache.invalidate(username)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_principals(session):
+    session.info.pop("changed_principals", None)
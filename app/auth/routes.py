@@ -11,15 +11,15 @@ router = APIRouter()
 
 
 @router.post("/register", response_model=schemas.UserOut)
-def register_user_endpoint(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    return register_user(db, user)
+async def register_user_endpoint(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    return await register_user(db, user)
 
 
 @router.post("/token", response_model=schemas.Token)
-def login_for_access_token(
+async def login_for_access_token(
     db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ):
-    user = authenticate_user(
+    user = await authenticate_user(
         db, username=form_data.username, password=form_data.password
     )
     if not user:
@@ -1,4 +1,7 @@
+import math
 import os
+import time
+from functools import lru_cache
 
 from dotenv import load_dotenv
 from passlib.context import CryptContext
@@ -8,17 +11,51 @@ import jwt
 
 load_dotenv()
 
+# At startup the bcrypt cost is calibrated to the highest one hashing within
+# PASSWORD_HASH_TARGET_MS here, between BCRYPT_MIN_ROUNDS and BCRYPT_MAX_ROUNDS.
+# BCRYPT_ROUNDS pins the cost instead.
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", 250))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 0)) or None
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", 10))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", 15))
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+@lru_cache
+def context_for(rounds: int) -> CryptContext:
+    # Hashes below this cost need an update; costlier ones are left alone.
+    return pwd_context.copy(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds)
+
+
+def get_password_hash(password, rounds: int = None):
+    return (context_for(rounds) if rounds else pwd_context).hash(password)
 
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update(plain_password, hashed_password, rounds: int = None):
+    """(valid, new_hash) where new_hash is set when the stored hash is below the current cost."""
+    return (context_for(rounds) if rounds else pwd_context).verify_and_update(plain_password, hashed_password)
+
+
+def time_hash(rounds: int) -> float:
+    start = time.perf_counter()
+    context_for(rounds).hash("calibration")
+    return time.perf_counter() - start
+
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int, max_rounds: int) -> int:
+    """Highest cost in [min_rounds, max_rounds] hashing within target_ms; each round doubles the work."""
+    # The first hash also loads the bcrypt backend, so keep the faster of two.
+    elapsed_ms = min(time_hash(min_rounds), time_hash(min_rounds)) * 1000
+    if elapsed_ms >= target_ms:
+        return min_rounds
+    return min(min_rounds + int(math.log2(target_ms / elapsed_ms)), max_rounds)
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=30))
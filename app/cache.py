@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# When set, caches are shared by every uvicorn worker through Redis instead of
+# living in each worker's memory.
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+
+class CacheBackend:
+    """Key/value store with per-entry TTL, shared by the in-process caches."""
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: float):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocalCache(CacheBackend):
+    """In-process TTL + LRU cache, private to one worker.
+
+    max_bytes caps the summed sizeof(value) of the entries on top of max_entries.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float):
+        if ttl <= 0:
+            return
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self.size += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.size > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by every worker, on any client exposing redis-py's get/set/delete."""
+
+    def __init__(self, client, prefix: str = "app:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("The redis package is required for a shared cache backend") from exc
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key: str):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value, ttl: float):
+        milliseconds = int(ttl * 1000)
+        if milliseconds > 0:
+            self.client.set(self.prefix + key, json.dumps(value), px=milliseconds)
+
+    def delete(self, key: str):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+def build_backend(prefix: str, max_entries: int, max_bytes: int = None, sizeof=None) -> CacheBackend:
+    if CACHE_REDIS_URL:
+        return RedisCache.from_url(CACHE_REDIS_URL, prefix=prefix)
+    return LocalCache(max_entries, max_bytes=max_bytes, sizeof=sizeof)
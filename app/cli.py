@@ -0,0 +1,59 @@
+import argparse
+import sys
+
+from .database import SessionLocal
+from .auth.auth_logic import get_user_by_username
+from .items import importer, stats
+from .migrations import upgrade
+
+
+def import_items(args):
+    with SessionLocal() as db:
+        user = get_user_by_username(db, args.username)
+    if user is None:
+        sys.exit(f"Unknown user: {args.username}")
+
+    def report(job):
+        print(f"\r{job.processed} rows read, {job.imported} imported, {job.failed} failed", end="", file=sys.stderr)
+
+    job = importer.ImportJob(user_id=user.id, format=args.format or importer.guess_format(args.file))
+    importer.run_import(SessionLocal, job, open(args.file, "rb"), batch_size=args.batch_size, progress=report)
+    print(file=sys.stderr)
+    for error in job.errors:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    return 0 if job.status == "completed" else 1
+
+
+def rebuild_stats(args):
+    with SessionLocal() as db:
+        mismatched = stats.rebuild_stats(db, check_only=args.check)
+    for user_id in mismatched:
+        print(f"user {user_id}: stored item stats differ from items", file=sys.stderr)
+    if args.check:
+        return 1 if mismatched else 0
+    print(f"Rebuilt item stats, {len(mismatched)} user(s) were out of date", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("import-items", help="import items from an NDJSON or CSV file")
+    command.add_argument("file")
+    command.add_argument("--username", required=True, help="owner of the imported items")
+    command.add_argument("--format", choices=["ndjson", "csv"], help="defaults to the file extension")
+    command.add_argument("--batch-size", type=int, default=importer.IMPORT_BATCH_SIZE)
+    command.set_defaults(handler=import_items)
+
+    command = commands.add_parser("rebuild-stats", help="recompute per-user item stats from the items table")
+    command.add_argument("--check", action="store_true", help="only report users whose stats are wrong")
+    command.set_defaults(handler=rebuild_stats)
+
+    args = parser.parse_args(argv)
+    upgrade()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
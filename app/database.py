@@ -1,18 +1,155 @@
 import os
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.concurrency import run_in_threadpool
+
+from .diagnostics import install_query_diagnostics
 
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# "sync" keeps the classic Session/engine pair, "async" serves requests from an
+# AsyncSession (aiosqlite for SQLite, asyncpg for PostgreSQL).
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync").lower()
+
+# "log" warns about slow statements and N+1 patterns, "strict" raises on the
+# latter (the test suite runs this way), "off" installs nothing.
+QUERY_DIAGNOSTICS = os.getenv("QUERY_DIAGNOSTICS", "off").lower()
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", 10))
+
+# "tuned" runs SQLite in WAL mode with the pragmas below on every new
+# connection; "default" keeps SQLite's own settings (rollback journal).
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "tuned").lower()
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    # Negative sizes are in KiB: 64 MiB of page cache per connection.
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64 * 1024)),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme or not sep:
+        return url
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+def engine_options(url: str, profile: str = DATABASE_PROFILE) -> dict:
+    """create_engine keyword arguments for url under profile."""
+    url = make_url(url)
+    options = {}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            # In-memory databases live in one connection; there is no pool to size.
+            return options
+    if profile == "tuned":
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+    return options
+
+
+def tune_sqlite(bind, pragmas: dict = None):
+    """Set pragmas on every new DBAPI connection of a SQLite engine."""
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(bind, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def make_engine(url: str, profile: str = DATABASE_PROFILE):
+    bind = create_engine(url, **engine_options(url, profile))
+    if profile == "tuned" and bind.dialect.name == "sqlite":
+        tune_sqlite(bind)
+    return bind
+
+
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+
+if DATABASE_MODE == "async":
+    async_url = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+    async_options = engine_options(async_url)
+    async_options.pop("connect_args", None)
+    if "pool_size" in async_options:
+        # aiosqlite defaults to NullPool; keep a sized pool like the sync engine.
+        async_options["poolclass"] = AsyncAdaptedQueuePool
+    async_engine = create_async_engine(async_url, **async_options)
+    if DATABASE_PROFILE == "tuned" and async_engine.dialect.name == "sqlite":
+        tune_sqlite(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
+
+
+def diagnose(bind):
+    """Install the QUERY_DIAGNOSTICS hooks on an engine, if enabled."""
+    if QUERY_DIAGNOSTICS != "off":
+        install_query_diagnostics(
+            bind, SLOW_QUERY_MS, QUERY_REPEAT_THRESHOLD, strict=QUERY_DIAGNOSTICS == "strict"
+        )
+
+
+# Read replicas of the primary, e.g. "sqlite:///./db_data/replica1.db,sqlite:///./db_data/replica2.db".
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+replica_engines = [make_engine(url) for url in DATABASE_REPLICA_URLS]
+
+for bind in [engine, *replica_engines]:
+    diagnose(bind)
+if async_engine is not None:
+    diagnose(async_engine.sync_engine)
+
 Base = declarative_base()
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """Run a sync ``fn(session, ...)`` without blocking the event loop.
+
+    AsyncSession hands ``fn`` its underlying Session through ``run_sync`` so the
+    same query code serves both modes; a plain Session is driven from the
+    threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+def session_factory_for(db):
+    """Sync session factory on the same database as db, for work outliving the request."""
+    if isinstance(db, AsyncSession):
+        return SessionLocal
+    return sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
@@ -6,12 +6,19 @@ from jose import JWTError, jwt
 from jwt import InvalidTokenError
 from sqlalchemy.orm import Session
 
+from .auth.auth_logic import get_user_by_username
+from .auth.principal_cache import principal_cache
 from .auth.schemas import TokenData
-from .database import SessionLocal
-from .auth.models import User
+from .database import AsyncSessionLocal, SessionLocal, run_db
+from .metrics import Histogram, timed
+from .replicas import db_reads, replicas
 
 
 async def get_db():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
     db = SessionLocal()
     try:
         yield db
@@ -19,11 +26,33 @@ async def get_db():
         db.close()
 
 
+def _replica_or(db, user_id: int = None):
+    replica = replicas.session(user_id)
+    if replica is None:
+        db_reads.inc(target="primary")
+        yield db
+        return
+    db_reads.inc(target="replica")
+    try:
+        yield replica
+    finally:
+        replica.close()
+
+
+def get_replica_db(db: Session = Depends(get_db)):
+    """A read-only session on a replica when any is configured and healthy, else the primary's."""
+    yield from _replica_or(db)
+
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+auth_step_seconds = Histogram("auth_step_seconds", "Time spent per authentication step", ["step"])
+
 
 async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    read_db: Session = Depends(get_replica_db),
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -31,7 +60,8 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=[os.getenv("ALGORITHM")])
+        with timed(auth_step_seconds, step="jwt_decode"):
+            payload = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=[os.getenv("ALGORITHM")])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -41,7 +71,20 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == token_data.username).first()
+    user = principal_cache.get(token_data.username)
+    if user is not None:
+        return user
+    with timed(auth_step_seconds, step="user_lookup"):
+        user = await run_db(read_db, get_user_by_username, token_data.username)
+        if user is None and read_db is not db:
+            # Just registered, and the replica has not caught up yet.
+            user = await run_db(db, get_user_by_username, token_data.username)
     if user is None:
         raise credentials_exception
+    principal_cache.put(user, expires_at=payload.get("exp"))
     return user
+
+
+def get_read_db(db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """Like get_replica_db, but on the primary while the user's own recent writes may not have replicated."""
+    yield from _replica_or(db, current_user.id)
@@ -0,0 +1,90 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+class RepeatedQueryError(RuntimeError):
+    """Raised in strict mode when a request repeats one statement shape too often (N+1)."""
+
+
+class _RequestQueries:
+    def __init__(self, scope):
+        self.scope = scope
+        self.total = 0
+        self.shapes = Counter()
+        self.reported = set()
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {route.path if route is not None else self.scope['path']}"
+
+
+# Statements of the request being served; the object is shared with threadpool
+# workers through the copied context.
+_current = ContextVar("request_queries", default=None)
+
+
+class QueryDiagnosticsMiddleware:
+    """Scope per-request query counting to each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        queries = _RequestQueries(scope)
+        token = _current.set(queries)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+            logger.debug("%s issued %d queries", queries.route, queries.total)
+
+
+def new_batch():
+    """Count statement repeats afresh from here on.
+
+    Chunked writes call it per chunk: each chunk legitimately issues the same
+    few statements once, which must not add up to an N+1 over the request.
+    """
+    queries = _current.get()
+    if queries is not None:
+        queries.shapes.clear()
+
+
+def install_query_diagnostics(engine, slow_ms: float, repeat_threshold: int, strict: bool = False):
+    """Log statements slower than slow_ms and requests repeating a statement repeat_threshold times.
+
+    Statements are compared on their SQL text with parameters left as
+    placeholders, so a lazy load issued once per row shows up as one shape.
+    In strict mode the repeat raises RepeatedQueryError instead of warning.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("diagnostics_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["diagnostics_start"].pop()) * 1000
+        queries = _current.get()
+        route = queries.route if queries is not None else "-"
+        if elapsed_ms >= slow_ms:
+            logger.warning("Slow query (%.1f ms) from %s: %s; parameters: %r", elapsed_ms, route, statement, parameters)
+        if queries is None:
+            return
+        queries.total += 1
+        queries.shapes[statement] += 1
+        if queries.shapes[statement] >= repeat_threshold and statement not in queries.reported:
+            queries.reported.add(statement)
+            message = f"{route} issued the same statement {repeat_threshold} times (N+1?): {statement}"
+            if strict:
+                raise RepeatedQueryError(message)
+            logger.warning(message)
@@ -0,0 +1,99 @@
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .metrics import COLLECTORS, Counter, Gauge, Histogram
+
+request_latency = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ["method", "route", "status"]
+)
+requests_in_flight = Gauge("http_requests_in_flight", "Requests currently being served")
+request_queries = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+request_db_time = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request", ["route"]
+)
+db_queries = Counter("db_queries_total", "SQL statements executed")
+db_query_time = Histogram("db_query_duration_seconds", "SQL statement latency")
+pool_gauges = {
+    name: Gauge(f"db_pool_{name}", f"Connection pool {name.replace('_', ' ')}", ["engine"])
+    for name in ("size", "checked_out", "overflow")
+}
+
+# [statements, seconds] of the request being served, shared with threadpool
+# workers through the copied context.
+_request_db = ContextVar("request_db", default=None)
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware: unlike BaseHTTPMiddleware it leaves streaming bodies alone."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        db_usage = [0, 0.0]
+        token = _request_db.set(db_usage)
+        requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_flight.dec()
+            _request_db.reset(token)
+            route = scope.get("route")
+            template = route.path if route is not None else "<unmatched>"
+            request_latency.observe(elapsed, method=scope["method"], route=template, status=status_code)
+            request_queries.observe(db_usage[0], route=template)
+            request_db_time.observe(db_usage[1], route=template)
+
+
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _stop_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    db_queries.inc()
+    db_query_time.observe(elapsed)
+    usage = _request_db.get()
+    if usage is not None:
+        usage[0] += 1
+        usage[1] += elapsed
+
+
+def instrument_queries():
+    """Time every statement of every engine, async ones included (they run on a sync Engine)."""
+    if not event.contains(Engine, "before_cursor_execute", _start_query):
+        event.listen(Engine, "before_cursor_execute", _start_query)
+        event.listen(Engine, "after_cursor_execute", _stop_query)
+
+
+def instrument_pool(engine, name: str):
+    """Export the occupancy of engine's connection pool, read at scrape time."""
+
+    def collect():
+        pool = engine.pool
+        for gauge, reading in (("size", "size"), ("checked_out", "checkedout"), ("overflow", "overflow")):
+            if hasattr(pool, reading):
+                pool_gauges[gauge].set(getattr(pool, reading)(), engine=name)
+
+    COLLECTORS.append(collect)
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import os
+import threading
+
+from dotenv import load_dotenv
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..metrics import Counter, Gauge
+from . import items_logic, models
+
+load_dotenv()
+
+# Set to share change events between workers over Redis pub/sub; otherwise
+# each worker only sees the writes it committed itself.
+CHANGES_REDIS_URL = os.getenv("CHANGES_REDIS_URL")
+CHANGES_REDIS_CHANNEL = os.getenv("CHANGES_REDIS_CHANNEL", "item-changes")
+CHANGES_SUBSCRIBER_QUEUE = int(os.getenv("CHANGES_SUBSCRIBER_QUEUE", 1000))
+CHANGES_REPLAY_LIMIT = int(os.getenv("CHANGES_REPLAY_LIMIT", 1000))
+CHANGES_HEARTBEAT_SECONDS = float(os.getenv("CHANGES_HEARTBEAT_SECONDS", 15))
+# Streams end after this long so clients reconnect (with Last-Event-ID) through
+# proxies and rebalance across workers.
+CHANGES_STREAM_MAX_SECONDS = float(os.getenv("CHANGES_STREAM_MAX_SECONDS", 300))
+
+subscribers_gauge = Gauge("items_change_feed_subscribers", "Open item change feed streams")
+events_published = Counter("items_change_events_total", "Item change events published")
+
+
+class Subscription:
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(queue_size)
+        # Set when events were dropped on a full queue: the client must resync.
+        self.overflowed = False
+
+    def offer(self, change: dict):
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class ChangeHub:
+    """Fans committed item changes out to the change feed streams of this worker."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(user_id, set()).add(subscription)
+        subscribers_gauge.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.user_id, None)
+        subscribers_gauge.dec()
+
+    def dispatch(self, changes: list):
+        """Deliver changes to subscribers; safe to call from any thread."""
+        for change in changes:
+            with self._lock:
+                subscriptions = list(self._subscriptions.get(change["user_id"], ()))
+            for subscription in subscriptions:
+                subscription.loop.call_soon_threadsafe(subscription.offer, change)
+
+
+class LocalBackend:
+    def __init__(self, hub: ChangeHub):
+        self.hub = hub
+
+    def publish(self, changes: list):
+        self.hub.dispatch(changes)
+
+    def start(self):
+        pass
+
+
+class RedisBackend:
+    """Publishes to a Redis channel that every worker's hub listens on, including this one."""
+
+    def __init__(self, hub: ChangeHub, client, channel: str):
+        self.hub = hub
+        self.client = client
+        self.channel = channel
+        self._listener = None
+
+    def publish(self, changes: list):
+        self.client.publish(self.channel, json.dumps(changes))
+
+    def start(self):
+        # Called on app startup, so a preforked worker runs its own listener thread.
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            self.hub.dispatch(json.loads(message["data"]))
+
+
+def build_backend(hub: ChangeHub):
+    if CHANGES_REDIS_URL:
+        import redis
+
+        return RedisBackend(hub, redis.Redis.from_url(CHANGES_REDIS_URL), CHANGES_REDIS_CHANNEL)
+    return LocalBackend(hub)
+
+
+def replay(db: Session, user_id: int, last_event_id: int) -> tuple[list, int | None]:
+    """Changes of user_id after last_event_id, and when they cannot all be replayed
+    (the log was pruned past it) the newest change id, to reset the client to.
+    """
+    oldest, newest = db.execute(select(func.min(models.ItemChange.id), func.max(models.ItemChange.id))).one()
+    pruned = oldest is not None and last_event_id + 1 < oldest
+    rows = db.execute(
+        select(models.ItemChange.id, models.ItemChange.user_id, models.ItemChange.item_id, models.ItemChange.op)
+        .where(models.ItemChange.user_id == user_id, models.ItemChange.id > last_event_id)
+        .order_by(models.ItemChange.id)
+        .limit(CHANGES_REPLAY_LIMIT)
+    ).all()
+    reset = pruned or len(rows) == CHANGES_REPLAY_LIMIT
+    return [row._asdict() for row in rows], newest if reset else None
+
+
+def format_event(change: dict) -> str:
+    data = json.dumps({"item_id": change["item_id"], "op": change["op"]})
+    return f"id: {change['id']}\nevent: {change['op']}\ndata: {data}\n\n"
+
+
+RESET_EVENT = "event: reset\ndata: {}\n\n"
+
+
+async def event_stream(subscription: Subscription, backlog: list, reset_id: int | None, last_event_id: int):
+    """SSE text: the backlog (or a reset if it cannot be replayed completely), then live changes."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + CHANGES_STREAM_MAX_SECONDS
+    try:
+        yield "retry: 1000\n\n"
+        if reset_id is not None:
+            # Carry the newest id, so the client's reconnect resumes after the
+            # reset instead of asking for the pruned range (and resetting) again.
+            yield f"id: {reset_id}\n{RESET_EVENT}"
+            last_event_id = reset_id
+        else:
+            for change in backlog:
+                yield format_event(change)
+                last_event_id = change["id"]
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                change = await asyncio.wait_for(
+                    subscription.queue.get(), min(CHANGES_HEARTBEAT_SECONDS, remaining)
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if subscription.overflowed:
+                yield RESET_EVENT
+                return
+            # Live events may repeat the tail of the replayed backlog.
+            if change["id"] > last_event_id:
+                yield format_event(change)
+                last_event_id = change["id"]
+    finally:
+        hub.unsubscribe(subscription)
+
+
+def publish(changes: list):
+    events_published.inc(len(changes))
+    backend.publish(changes)
+
+
+hub = ChangeHub(CHANGES_SUBSCRIBER_QUEUE)
+backend = build_backend(hub)
+items_logic.change_listeners.append(publish)
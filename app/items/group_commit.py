@@ -0,0 +1,145 @@
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import items_logic, schemas
+from ..database import session_factory_for
+from ..metrics import Counter, Gauge, Histogram
+
+load_dotenv()
+
+# With group commit on, POST /items/ rows from concurrent requests share one
+# transaction (and one fsync), flushed every GROUP_COMMIT_MAX_DELAY_MS or
+# GROUP_COMMIT_MAX_ROWS rows, whichever comes first. Each request still
+# answers only once its row is committed.
+GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() in ("1", "true", "yes")
+GROUP_COMMIT_MAX_ROWS = int(os.getenv("GROUP_COMMIT_MAX_ROWS", 200))
+GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("GROUP_COMMIT_MAX_DELAY_MS", 5))
+GROUP_COMMIT_QUEUE_SIZE = int(os.getenv("GROUP_COMMIT_QUEUE_SIZE", 10000))
+GROUP_COMMIT_RETRY_AFTER = int(os.getenv("GROUP_COMMIT_RETRY_AFTER", 1))
+
+queue_depth = Gauge("group_commit_queue_depth", "Item writes waiting for a group commit")
+batch_rows = Histogram(
+    "group_commit_batch_rows", "Rows per group commit", buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+)
+flush_latency = Histogram("group_commit_flush_seconds", "Time to write and commit one batch")
+ack_latency = Histogram("group_commit_wait_seconds", "Time from enqueueing a row to its commit")
+rejected = Counter("group_commit_rejected_total", "Item writes rejected with 503 on a full queue")
+
+
+class GroupCommitter:
+    def __init__(self, max_rows: int, max_delay_ms: float, queue_size: int, retry_after: int):
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+    def _ensure_worker(self):
+        # The queue and task belong to one event loop; a new loop (tests, reloads) gets its own.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(self.queue_size)
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, db, user_id: int, item: schemas.ItemCreate) -> dict:
+        """Queue item for the next batch on db's database and wait until it is committed."""
+        self._ensure_worker()
+        session_factory = session_factory_for(db)
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait((session_factory.kw["bind"], user_id, item, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            rejected.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many pending item writes",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        queue_depth.set(self._queue.qsize())
+        return await future
+
+    async def _run(self):
+        # None is the stop signal sent by drain(); rows queued before it are still flushed.
+        while True:
+            entry = await self._queue.get()
+            if entry is None:
+                return
+            batch = [entry]
+            deadline = self._loop.time() + self.max_delay
+            while len(batch) < self.max_rows:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if entry is None:
+                    await self._flush(batch)
+                    return
+                batch.append(entry)
+            queue_depth.set(self._queue.qsize())
+            await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        by_bind = {}
+        for entry in batch:
+            by_bind.setdefault(entry[0], []).append(entry)
+        for bind, entries in by_bind.items():
+            start = time.perf_counter()
+            try:
+                rows = await run_in_threadpool(_write, bind, [(user_id, item) for _, user_id, item, _, _ in entries])
+            except Exception:
+                # Isolate the failure: each row retries alone so one bad row cannot fail its batch-mates.
+                for entry in entries:
+                    await self._flush_one(bind, entry)
+                continue
+            batch_rows.observe(len(entries))
+            flush_latency.observe(time.perf_counter() - start)
+            for (_, _, _, future, queued_at), row in zip(entries, rows):
+                _resolve(future, row, queued_at)
+
+    async def _flush_one(self, bind, entry):
+        _, user_id, item, future, queued_at = entry
+        try:
+            row = (await run_in_threadpool(_write, bind, [(user_id, item)]))[0]
+        except Exception as exc:
+            if not future.done():
+                future.set_exception(exc)
+            return
+        batch_rows.observe(1)
+        _resolve(future, row, queued_at)
+
+    async def drain(self):
+        """Flush whatever is queued and stop the worker, e.g. on shutdown."""
+        if self._worker is None or self._loop is not asyncio.get_running_loop():
+            return
+        await self._queue.put(None)
+        await self._worker
+        queue_depth.set(0)
+        self._loop = self._queue = self._worker = None
+
+
+def _write(bind, entries: list) -> list[dict]:
+    with Session(bind=bind, autoflush=False) as db:
+        return items_logic.create_items_grouped(db, entries)
+
+
+def _resolve(future, row: dict, queued_at: float):
+    ack_latency.observe(time.perf_counter() - queued_at)
+    if not future.done():
+        future.set_result(row)
+
+
+committer = GroupCommitter(
+    GROUP_COMMIT_MAX_ROWS, GROUP_COMMIT_MAX_DELAY_MS, GROUP_COMMIT_QUEUE_SIZE, GROUP_COMMIT_RETRY_AFTER
+)
@@ -0,0 +1,149 @@
+import csv
+import io
+import json
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field, fields
+
+from dotenv import load_dotenv
+from pydantic import ValidationError
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from ..diagnostics import new_batch
+from . import items_logic, models, schemas
+
+load_dotenv()
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 100))
+IMPORT_JOB_HISTORY = int(os.getenv("IMPORT_JOB_HISTORY", 100))
+
+
+@dataclass
+class ImportJob:
+    user_id: int
+    format: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"
+    processed: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    started_at: float = None
+    finished_at: float = None
+
+    def add_error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+
+class JobRegistry:
+    """Import jobs stored in item_import_jobs, so any worker can report on them.
+
+    Keeps the IMPORT_JOB_HISTORY most recently created.
+    """
+
+    def __init__(self, history: int):
+        self.history = history
+
+    def save(self, db: Session, job: ImportJob):
+        db.merge(models.ItemImportJob(**asdict(job)))
+        db.commit()
+
+    def add(self, db: Session, job: ImportJob):
+        oldest_kept = (
+            select(models.ItemImportJob.created_at)
+            .order_by(models.ItemImportJob.created_at.desc())
+            .offset(self.history - 1)
+            .limit(1)
+            .scalar_subquery()
+        )
+        db.add(models.ItemImportJob(**asdict(job)))
+        db.flush()
+        db.execute(delete(models.ItemImportJob).where(models.ItemImportJob.created_at < oldest_kept))
+        db.commit()
+        return job
+
+    def get(self, db: Session, job_id: str):
+        row = db.get(models.ItemImportJob, job_id)
+        if row is None:
+            return None
+        return ImportJob(**{f.name: getattr(row, f.name) for f in fields(ImportJob)})
+
+
+jobs = JobRegistry(IMPORT_JOB_HISTORY)
+
+
+def guess_format(filename: str | None) -> str:
+    return "csv" if filename and filename.lower().endswith(".csv") else "ndjson"
+
+
+def iter_records(stream, format: str):
+    """Yield (line, record-or-error) pairs from a binary stream without reading it whole."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if format == "csv":
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, {key: value or None for key, value in record.items()}
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as exc:
+            yield line_number, exc
+
+
+def _describe(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+        )
+    return str(exc)
+
+
+def run_import(session_factory, job: ImportJob, stream, batch_size: int = None, progress=None):
+    """Validate records in batches of ItemCreate and insert each batch in its own transaction."""
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    with session_factory() as db:
+        job.status, job.started_at = "running", time.time()
+        jobs.save(db, job)
+        try:
+            batch = []
+            for line, record in iter_records(stream, job.format):
+                job.processed += 1
+                try:
+                    if isinstance(record, Exception):
+                        raise record
+                    batch.append(schemas.ItemCreate.model_validate(record))
+                except (ValidationError, ValueError) as exc:
+                    job.add_error(line, _describe(exc))
+                if len(batch) >= batch_size:
+                    _flush(db, job, batch, progress)
+            _flush(db, job, batch, progress)
+            job.status = "completed"
+        except Exception as exc:
+            db.rollback()
+            job.status = "failed"
+            job.errors.append({"line": None, "error": _describe(exc)})
+        finally:
+            job.finished_at = time.time()
+            stream.close()
+            jobs.save(db, job)
+    return job
+
+
+def _flush(db, job: ImportJob, batch: list, progress):
+    new_batch()
+    if batch:
+        items_logic.create_items(db, batch, job.user_id, atomic=True, chunk_size=len(batch))
+        job.imported += len(batch)
+        batch.clear()
+        jobs.save(db, job)
+    if progress is not None:
+        progress(job)
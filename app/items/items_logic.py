@@ -1,19 +1,183 @@
+import base64
+import binascii
+import csv
+import io
+import json
+import os
+
+from dotenv import load_dotenv
 from fastapi import HTTPException, status
-from sqlalchemy import or_
+from sqlalchemy import and_, bindparam, delete, event, func, insert, literal_column, or_, select, tuple_, update
 from sqlalchemy.orm import Session
-from . import models, schemas
+from ..diagnostics import new_batch
+from . import models, schemas, search, stats
+
+load_dotenv()
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 500))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+# The change log keeps about this many of the most recent item writes, pruned
+# every CHANGE_LOG_PRUNE_EVERY changes.
+CHANGE_LOG_MAX_ROWS = int(os.getenv("CHANGE_LOG_MAX_ROWS", 100000))
+CHANGE_LOG_PRUNE_EVERY = int(os.getenv("CHANGE_LOG_PRUNE_EVERY", 1000))
+
+EXPORT_COLUMNS = (
+    models.Item.id,
+    models.Item.name,
+    models.Item.description,
+    models.Item.price,
+    models.Item.user_id,
+)
+
+# Listings select plain column tuples in ItemResponse field order, skipping ORM
+# identity mapping and per-row model validation entirely.
+RESPONSE_FIELDS = tuple(schemas.ItemResponse.model_fields)
+
+# Callables notified with the user id once a commit changed that user's items;
+# the in-process caches subscribe here to drop stale entries.
+write_listeners = []
+
+# Callables notified with the committed change log entries (dicts with id,
+# user_id, item_id and op); the change feed hub subscribes here.
+change_listeners = []
+
+# Keyset orderings for listings: every sort ends on the primary key so the
+# cursor always identifies a unique position.
+SORT_COLUMNS = {
+    "id": (models.Item.id,),
+    "price": (models.Item.price, models.Item.id),
+}
+
+
+def encode_cursor(sort: str, item) -> str:
+    values = [getattr(item, column.key) for column in SORT_COLUMNS[sort]]
+    raw = json.dumps([sort, *values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort, *values = json.loads(raw)
+        if sort not in SORT_COLUMNS or len(values) != len(SORT_COLUMNS[sort]):
+            raise ValueError(cursor)
+        # Only a price may be null (items without one sort first).
+        for column, value in zip(SORT_COLUMNS[sort], values):
+            numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+            if not (numeric or (value is None and column is models.Item.price)):
+                raise ValueError(cursor)
+            if column is models.Item.id and not isinstance(value, int):
+                raise ValueError(cursor)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return sort, values
+
+
+def seek_after(sort: str, values: list):
+    """Filter for the rows ordered after the cursor position values."""
+    if sort == "price" and values[0] is None:
+        # SQLite sorts NULL prices first, and a row comparison with NULL is
+        # never true: continue among the NULL prices by id, then every priced row.
+        return or_(
+            and_(models.Item.price.is_(None), models.Item.id > values[1]),
+            models.Item.price.is_not(None),
+        )
+    return tuple_(*SORT_COLUMNS[sort]) > tuple(values)
+
+
+def touch_collection(db: Session, user_id: int) -> int:
+    """Bump the user's collection version inside the writing transaction and return it.
+
+    Written items take it as their version: it never repeats for a user, so
+    an item ETag stays unique even when SQLite hands a deleted item's id out again.
+    """
+    version = db.execute(
+        update(models.ItemCollection)
+        .where(models.ItemCollection.user_id == user_id)
+        .values(version=models.ItemCollection.version + 1)
+        .returning(models.ItemCollection.version)
+    ).scalar()
+    if version is None:
+        # Start above the versions of items written before the collection was tracked.
+        version = db.execute(
+            select(func.coalesce(func.max(models.Item.version), 0) + 1).where(models.Item.user_id == user_id)
+        ).scalar()
+        db.add(models.ItemCollection(user_id=user_id, version=version))
+        db.flush()
+    db.info.setdefault("touched_users", set()).add(user_id)
+    # (version before, version after) the transaction, for change listeners.
+    versions = db.info.setdefault("collection_versions", {})
+    versions[user_id] = (versions.get(user_id, (version - 1,))[0], version)
+    return version
+
+
+def record_changes(db: Session, user_id: int, op: str, items):
+    """Append item writes, as (item_id, old_price, new_price), to the change log inside the writing transaction."""
+    items = list(items)
+    if not items:
+        return
+    rows = [{"user_id": user_id, "item_id": item_id, "op": op} for item_id, _, _ in items]
+    ids = db.execute(
+        insert(models.ItemChange).returning(models.ItemChange.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    db.info.setdefault("changes", []).extend(
+        {"id": change_id, **row, "old_price": old_price, "new_price": new_price}
+        for change_id, row, (_, old_price, new_price) in zip(ids, rows, items)
+    )
+    if (ids[0] - 1) // CHANGE_LOG_PRUNE_EVERY != ids[-1] // CHANGE_LOG_PRUNE_EVERY:
+        db.execute(delete(models.ItemChange).where(models.ItemChange.id <= ids[-1] - CHANGE_LOG_MAX_ROWS))
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_writes(session):
+    for user_id in session.info.pop("touched_users", ()):
+        for listener in write_listeners:
+            listener(user_id)
+    changes = session.info.pop("changes", None)
+    versions = session.info.pop("collection_versions", {})
+    if changes:
+        for change in changes:
+            change["collection_version"] = versions.get(change["user_id"])
+        for listener in change_listeners:
+            listener(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_writes(session):
+    session.info.pop("touched_users", None)
+    session.info.pop("changes", None)
+    session.info.pop("collection_versions", None)
+
+
+def get_collection_version(db: Session, user_id: int) -> int:
+    version = db.execute(
+        select(models.ItemCollection.version).where(models.ItemCollection.user_id == user_id)
+    ).scalar()
+    return version or 0
+
+
+def get_item_version(db: Session, item_id: int, user_id: int) -> int:
+    version = db.execute(
+        select(models.Item.version).where(models.Item.id == item_id, models.Item.user_id == user_id)
+    ).scalar()
+    if version is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return version
 
 
 def create_item(db: Session, item: schemas.ItemCreate, user_id: int):
-    db_item = models.Item(**item.dict(), user_id=user_id)
+    db_item = models.Item(**item.dict(), user_id=user_id, version=touch_collection(db, user_id))
     db.add(db_item)
+    db.flush()
+    stats.apply_delta(db, user_id, added=[db_item.price])
+    record_changes(db, user_id, "create", [(db_item.id, None, db_item.price)])
     db.commit()
     db.refresh(db_item)
     return db_item
 
 
-def get_item(db: Session, item_id: int, user_id: int):
-    item = db.query(models.Item).filter(models.Item.id == item_id, models.Item.user_id == user_id).first()
+def get_item(db: Session, item_id: int, user_id: int, entities=(models.Item,)):
+    item = db.query(*entities).filter(models.Item.id == item_id, models.Item.user_id == user_id).first()
     if item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return item
@@ -28,8 +192,13 @@ def update_item(db: Session, item_id: int, item: schemas.ItemUpdate, user_id: in
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to modify this item"
         )
+    old_price = db_item.price
     for key, value in item.dict(exclude_unset=True).items():
         setattr(db_item, key, value)
+    db_item.version = touch_collection(db, user_id)
+    if db_item.price != old_price:
+        stats.apply_delta(db, user_id, added=[db_item.price], removed=[old_price])
+    record_changes(db, user_id, "update", [(db_item.id, old_price, db_item.price)])
     db.commit()
     db.refresh(db_item)
     return db_item
@@ -45,30 +214,249 @@ def delete_item(db: Session, item_id: int, user_id: int):
             detail="Not authorized to delete this item"
         )
     db.delete(db_item)
+    db.flush()
+    # Take the write lock before reading the aggregates apply_delta rewrites.
+    touch_collection(db, user_id)
+    stats.apply_delta(db, user_id, removed=[db_item.price])
+    record_changes(db, user_id, "delete", [(db_item.id, db_item.price, None)])
     db.commit()
     return db_item
 
 
-def get_items(
+def items_query(
     db: Session,
     user_id: int,
-    skip: int = 0,
-    limit: int = 10,
     min_price: float = None,
     max_price: float = None,
     query: str = None,
+    sort: str = "id",
+    cursor: str = None,
+    entities=(models.Item,),
 ):
-    base_query = db.query(models.Item).filter(models.Item.user_id == user_id)
+    """Build the ordered, filtered query behind every items listing."""
+    base_query = db.query(*entities).filter(models.Item.user_id == user_id)
+
+    if cursor:
+        sort, values = decode_cursor(cursor)
+        base_query = base_query.filter(seek_after(sort, values))
 
     if min_price is not None:
         base_query = base_query.filter(models.Item.price >= min_price)
     if max_price is not None:
         base_query = base_query.filter(models.Item.price <= max_price)
 
-    if query:
-        search = f"%{query}%"
+    match = search.match_expression(query) if query and search.fts_enabled(db) else None
+    if match:
+        base_query = base_query.join(
+            search.items_fts, search.items_fts.c.rowid == models.Item.id
+        ).filter(literal_column("items_fts").op("MATCH")(match))
+    elif query:
+        pattern = f"%{query}%"
         base_query = base_query.filter(
-            or_(models.Item.name.ilike(search), models.Item.description.ilike(search))
+            or_(models.Item.name.ilike(pattern), models.Item.description.ilike(pattern))
         )
 
+    if sort == "rank":
+        order = (search.items_fts.c.rank, models.Item.id) if match else SORT_COLUMNS["id"]
+    else:
+        order = SORT_COLUMNS[sort]
+    return base_query.order_by(*order)
+
+
+def get_items(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    min_price: float = None,
+    max_price: float = None,
+    query: str = None,
+    sort: str = "id",
+    cursor: str = None,
+    entities=(models.Item,),
+):
+    base_query = items_query(db, user_id, min_price, max_price, query, sort, cursor, entities)
     return base_query.offset(skip).limit(limit).all()
+
+
+def select_columns(fields, sort: str = None):
+    """Item columns for fields, followed by any sort key the page cursor still needs."""
+    names = list(fields)
+    names += [column.key for column in SORT_COLUMNS.get(sort, ()) if column.key not in names]
+    return tuple(getattr(models.Item, name) for name in names)
+
+
+def get_items_page(
+    db: Session, user_id: int, limit: int = 10, sort: str = "id", fields=None, **filters
+):
+    """Return one page of items and the cursor of the next page (None on the last one).
+
+    With fields, rows are tuples of those columns first, then any extra sort key.
+    """
+    if filters.get("cursor"):
+        sort = decode_cursor(filters["cursor"])[0]
+    if fields is not None:
+        filters["entities"] = select_columns(fields, sort)
+    items = get_items(db, user_id, limit=limit + 1, sort=sort, **filters)
+    # Relevance order depends on the search terms, so it only pages with skip/limit.
+    has_more = len(items) > limit and sort in SORT_COLUMNS
+    next_cursor = encode_cursor(sort, items[limit - 1]) if has_more else None
+    return items[:limit], next_cursor
+
+
+def _chunks(rows: list, size: int):
+    for start in range(0, len(rows), size):
+        yield start, rows[start:start + size]
+
+
+def _owned_prices(db: Session, ids, user_id: int) -> dict:
+    """Map the ids among ids that user_id owns to their current price."""
+    rows = db.execute(
+        select(models.Item.id, models.Item.price).where(models.Item.user_id == user_id, models.Item.id.in_(ids))
+    )
+    return dict(rows.all())
+
+
+def _run_chunked(db: Session, rows: list, write_chunk, atomic: bool, chunk_size: int):
+    """Apply write_chunk to rows chunk by chunk, committing each chunk unless atomic."""
+    results = []
+    try:
+        for start, chunk in _chunks(rows, chunk_size or BULK_CHUNK_SIZE):
+            new_batch()
+            results.extend(write_chunk(start, chunk))
+            if not atomic:
+                db.commit()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return results
+
+
+def create_items(
+    db: Session, items: list[schemas.ItemCreate], user_id: int, atomic: bool = False, chunk_size: int = None
+):
+    statement = insert(models.Item).returning(models.Item.id, sort_by_parameter_order=True)
+
+    def write_chunk(start, chunk):
+        version = touch_collection(db, user_id)
+        rows = [{**item.dict(), "user_id": user_id, "version": version} for item in chunk]
+        ids = db.execute(statement, rows).scalars().all()
+        stats.apply_delta(db, user_id, added=[item.price for item in chunk])
+        record_changes(db, user_id, "create", [(item_id, None, item.price) for item_id, item in zip(ids, chunk)])
+        return [
+            schemas.BulkItemResult(index=start + offset, id=item_id, status=status.HTTP_201_CREATED)
+            for offset, item_id in enumerate(ids)
+        ]
+
+    return _run_chunked(db, items, write_chunk, atomic, chunk_size)
+
+
+def create_items_grouped(db: Session, entries: list[tuple[int, schemas.ItemCreate]]) -> list[dict]:
+    """Insert (user_id, item) pairs of any users in one transaction; return their rows in order."""
+    statement = insert(models.Item).returning(
+        *select_columns(RESPONSE_FIELDS), sort_by_parameter_order=True
+    )
+    try:
+        versions = {user_id: touch_collection(db, user_id) for user_id, _ in entries}
+        rows = db.execute(
+            statement,
+            [{**item.dict(), "user_id": user_id, "version": versions[user_id]} for user_id, item in entries],
+        ).all()
+        added, created = {}, {}
+        for (user_id, item), row in zip(entries, rows):
+            added.setdefault(user_id, []).append(item.price)
+            created.setdefault(user_id, []).append((row.id, None, item.price))
+        for user_id, prices in added.items():
+            stats.apply_delta(db, user_id, added=prices)
+            record_changes(db, user_id, "create", created[user_id])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return [dict(zip(RESPONSE_FIELDS, row)) for row in rows]
+
+
+def update_items(
+    db: Session, items: list[schemas.ItemPatch], user_id: int, atomic: bool = False, chunk_size: int = None
+):
+    def write_chunk(start, chunk):
+        owned = _owned_prices(db, [item.id for item in chunk], user_id)
+        results, batches, added, removed, changed = [], {}, [], [], []
+        for offset, item in enumerate(chunk):
+            if item.id not in owned:
+                results.append(schemas.BulkItemResult(
+                    index=start + offset, id=item.id, status=status.HTTP_404_NOT_FOUND, detail="Item not found"
+                ))
+                continue
+            values = item.dict(exclude_unset=True, exclude={"id"})
+            if values:
+                batches.setdefault(tuple(sorted(values)), []).append({"_id": item.id, **values})
+                changed.append((item.id, owned[item.id], values.get("price", owned[item.id])))
+            if "price" in values and values["price"] != owned[item.id]:
+                added.append(values["price"])
+                removed.append(owned[item.id])
+                owned[item.id] = values["price"]
+            results.append(schemas.BulkItemResult(index=start + offset, id=item.id, status=status.HTTP_200_OK))
+        if not batches:
+            return results
+        version = touch_collection(db, user_id)
+        # executemany needs the same SET clause for every row, so group rows by the fields they change.
+        for columns, rows in batches.items():
+            statement = (
+                update(models.Item.__table__)
+                .where(models.Item.id == bindparam("_id"))
+                .values({column: bindparam(column) for column in columns})
+                .values(version=version)
+            )
+            db.execute(statement, rows)
+        stats.apply_delta(db, user_id, added=added, removed=removed)
+        record_changes(db, user_id, "update", changed)
+        return results
+
+    return _run_chunked(db, items, write_chunk, atomic, chunk_size)
+
+
+def delete_items(db: Session, ids: list[int], user_id: int, atomic: bool = False, chunk_size: int = None):
+    def write_chunk(start, chunk):
+        owned = _owned_prices(db, chunk, user_id)
+        if owned:
+            db.execute(delete(models.Item).where(models.Item.id.in_(owned)))
+            stats.apply_delta(db, user_id, removed=owned.values())
+            touch_collection(db, user_id)
+            record_changes(db, user_id, "delete", [(item_id, price, None) for item_id, price in owned.items()])
+        return [
+            schemas.BulkItemResult(index=start + offset, id=item_id, status=status.HTTP_204_NO_CONTENT)
+            if item_id in owned
+            else schemas.BulkItemResult(
+                index=start + offset, id=item_id, status=status.HTTP_404_NOT_FOUND, detail="Item not found"
+            )
+            for offset, item_id in enumerate(chunk)
+        ]
+
+    return _run_chunked(db, ids, write_chunk, atomic, chunk_size)
+
+
+def export_items(session_factory, user_id: int, format: str = "ndjson", **filters):
+    """Stream a user's items as NDJSON or CSV text, EXPORT_BATCH_SIZE rows at a time.
+
+    The generator owns its session: it outlives the request's get_db session.
+    """
+    names = [column.key for column in EXPORT_COLUMNS]
+    with session_factory() as db:
+        rows = items_query(db, user_id, entities=EXPORT_COLUMNS, **filters).yield_per(EXPORT_BATCH_SIZE)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if format == "csv":
+            writer.writerow(names)
+        for count, row in enumerate(rows, start=1):
+            if format == "csv":
+                writer.writerow(row)
+            else:
+                buffer.write(json.dumps(dict(zip(names, row))) + "\n")
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+
+from dotenv import load_dotenv
+
+from ..cache import CacheBackend, build_backend
+from ..metrics import Counter
+
+load_dotenv()
+
+LISTING_CACHE_TTL = float(os.getenv("LISTING_CACHE_TTL", 30))
+LISTING_CACHE_MAX_ENTRIES = int(os.getenv("LISTING_CACHE_MAX_ENTRIES", 10000))
+LISTING_CACHE_MAX_BYTES = int(os.getenv("LISTING_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+listing_cache_requests = Counter(
+    "items_listing_cache_requests_total", "Item listing cache lookups", ["result"]
+)
+
+
+def normalize_params(params: dict) -> str:
+    normalized = {}
+    for key, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = " ".join(value.lower().split()) if key == "query" else value
+        elif isinstance(value, float):
+            value = repr(value)
+        normalized[key] = value
+    return json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+
+
+class ListingCache:
+    """Serialized GET /items/ pages per user, collection version and filter set.
+
+    A write bumps the user's collection version, so pages cached before it
+    are never looked up again, on this worker or any other; they age out
+    with the TTL or LRU eviction.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    def key(self, user_id: int, version: int, params: dict) -> str:
+        digest = hashlib.sha1(normalize_params(params).encode()).hexdigest()
+        return f"page:{user_id}:{version}:{digest}"
+
+    def get(self, key: str):
+        entry = self.backend.get(key) if self.ttl > 0 else None
+        listing_cache_requests.inc(result="hit" if entry is not None else "miss")
+        return entry
+
+    def put(self, key: str, body: str, headers: dict):
+        self.backend.set(key, {"body": body, "headers": headers}, self.ttl)
+
+
+listing_cache = ListingCache(
+    build_backend(
+        "listing:",
+        LISTING_CACHE_MAX_ENTRIES,
+        max_bytes=LISTING_CACHE_MAX_BYTES,
+        sizeof=lambda entry: len(entry["body"]) if isinstance(entry, dict) else len(entry),
+    ),
+    LISTING_CACHE_TTL,
+)
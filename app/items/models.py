@@ -1,16 +1,83 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import JSON, Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from ..database import Base
 
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        # Every items query is scoped to one owner: by id for lookups and
+        # id-ordered pages, by price for price filters and price-ordered pages.
+        Index("ix_items_user_id_id", "user_id", "id"),
+        Index("ix_items_user_id_price", "user_id", "price"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(String, nullable=True)
     price = Column(Float)
+    # The owner's collection version at the item's last write; feeds the item's ETag.
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     user_id = Column(Integer, ForeignKey("users.id"))
 
     owner = relationship("User", back_populates="items")
+
+
+class ItemCollection(Base):
+    """Per-user version of the item collection, bumped by every write to it."""
+
+    __tablename__ = "item_collections"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class ItemStats(Base):
+    """Per-user price aggregates, maintained by every write to the user's items."""
+
+    __tablename__ = "item_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+    min_price = Column(Float, nullable=True)
+    max_price = Column(Float, nullable=True)
+
+
+class ItemPriceBucket(Base):
+    __tablename__ = "item_price_buckets"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ItemChange(Base):
+    """Bounded log of item writes, replayed to change feed clients resuming from a Last-Event-ID."""
+
+    __tablename__ = "item_changes"
+    __table_args__ = (Index("ix_item_changes_user_id_id", "user_id", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    item_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)
+
+
+class ItemImportJob(Base):
+    """Progress of background item imports, readable from every worker."""
+
+    __tablename__ = "item_import_jobs"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    format = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    processed = Column(Integer, nullable=False, default=0)
+    imported = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    errors = Column(JSON, nullable=False, default=list)
+    created_at = Column(Float, nullable=False, index=True)
+    started_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True)
@@ -0,0 +1,202 @@
+import heapq
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..metrics import Counter, Gauge
+from . import items_logic, models
+
+load_dotenv()
+
+# Answers price-filtered listings from per-user (price, id) arrays held in
+# memory, fetching only the rows of the page from the database.
+PRICE_INDEX_ENABLED = os.getenv("PRICE_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+PRICE_INDEX_MAX_BYTES = int(os.getenv("PRICE_INDEX_MAX_BYTES", 64 * 1024 * 1024))
+
+index_bytes = Gauge("items_price_index_bytes", "Memory held by the in-process price index")
+index_lookups = Counter("items_price_index_lookups_total", "Price index lookups", ["result"])
+index_evictions = Counter("items_price_index_evictions_total", "Users evicted from the price index")
+
+
+class UserPrices:
+    """One user's items with a price, as parallel arrays sorted by (price, id)."""
+
+    __slots__ = ("prices", "ids", "version")
+
+    def __init__(self, pairs, version: int):
+        self.prices = array("d")
+        self.ids = array("q")
+        for price, item_id in pairs:
+            self.prices.append(price)
+            self.ids.append(item_id)
+        self.version = version
+
+    @property
+    def nbytes(self) -> int:
+        return (len(self.prices) + len(self.ids)) * 8 + 200
+
+    def position(self, price: float, item_id: int) -> int:
+        """Index where (price, item_id) is or would be inserted."""
+        lo, hi = bisect_left(self.prices, price), bisect_right(self.prices, price)
+        return bisect_left(self.ids, item_id, lo, hi)
+
+    def after(self, price: float, item_id: int) -> int:
+        """Index of the first pair greater than (price, item_id)."""
+        lo, hi = bisect_left(self.prices, price), bisect_right(self.prices, price)
+        return bisect_right(self.ids, item_id, lo, hi)
+
+    def add(self, price: float, item_id: int):
+        index = self.position(price, item_id)
+        # Idempotent: an entry loaded just after the commit already holds the pair.
+        if index < len(self.ids) and self.ids[index] == item_id and self.prices[index] == price:
+            return
+        self.prices.insert(index, price)
+        self.ids.insert(index, item_id)
+
+    def remove(self, price: float, item_id: int):
+        index = self.position(price, item_id)
+        if index < len(self.ids) and self.ids[index] == item_id and self.prices[index] == price:
+            del self.prices[index]
+            del self.ids[index]
+
+
+class PriceIndex:
+    """Lazily loaded UserPrices per user, least recently used evicted beyond max_bytes.
+
+    An entry is tagged with the user's collection version. Local commits
+    update it in place when they follow on from that version; any other
+    gap (another worker wrote) is noticed on the next lookup and reloads it.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, db: Session, user_id: int, version: int) -> UserPrices:
+        with self.lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(user_id)
+                index_lookups.inc(result="hit")
+                return entry
+        index_lookups.inc(result="load")
+        entry = UserPrices(
+            db.execute(
+                select(models.Item.price, models.Item.id)
+                .where(models.Item.user_id == user_id, models.Item.price.is_not(None))
+                .order_by(models.Item.price, models.Item.id)
+            ),
+            version,
+        )
+        with self.lock:
+            self._store(user_id, entry)
+        return entry
+
+    def _store(self, user_id: int, entry: UserPrices):
+        self._discard(user_id)
+        self._entries[user_id] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            cold_user = next(iter(self._entries))
+            self._discard(cold_user)
+            index_evictions.inc()
+        index_bytes.set(self._bytes)
+
+    def _discard(self, user_id: int):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+    def apply(self, changes: list):
+        """Change listener: fold committed price changes into loaded entries."""
+        with self.lock:
+            for change in changes:
+                entry = self._entries.get(change["user_id"])
+                versions = change.get("collection_version")
+                if entry is None:
+                    continue
+                # Apply only on top of the version the commit started from (or
+                # already reached, for its later changes); otherwise reload.
+                if versions is None or entry.version not in versions:
+                    self._discard(change["user_id"])
+                    continue
+                self._bytes -= entry.nbytes
+                if change["old_price"] is not None:
+                    entry.remove(change["old_price"], change["item_id"])
+                if change["new_price"] is not None:
+                    entry.add(change["new_price"], change["item_id"])
+                self._bytes += entry.nbytes
+                # Every change of one commit carries the same (before, after) pair.
+                entry.version = versions[1]
+            index_bytes.set(self._bytes)
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+            self._bytes = 0
+            index_bytes.set(0)
+
+
+def get_items_page(
+    db: Session, user_id: int, version: int, limit: int = 10, sort: str = "id", fields=None, **filters
+):
+    """items_logic.get_items_page, served from the price index when the filters allow it.
+
+    Only price-filtered listings without a text query, ordered by price or id,
+    use the index; items without a price never match a price filter, so the
+    arrays can leave them out.
+    """
+    min_price, max_price = filters.get("min_price"), filters.get("max_price")
+    cursor, skip = filters.get("cursor"), filters.get("skip") or 0
+    if cursor:
+        sort, cursor_values = items_logic.decode_cursor(cursor)
+    if (
+        not PRICE_INDEX_ENABLED
+        or fields is None
+        or filters.get("query")
+        or sort not in items_logic.SORT_COLUMNS
+        or (min_price is None and max_price is None)
+        # Past items without a price: the arrays leave those out.
+        or (cursor and None in cursor_values)
+    ):
+        return items_logic.get_items_page(db, user_id, limit=limit, sort=sort, fields=fields, **filters)
+
+    entry = price_index.lookup(db, user_id, version)
+    with price_index.lock:
+        lo = bisect_left(entry.prices, min_price) if min_price is not None else 0
+        hi = bisect_right(entry.prices, max_price) if max_price is not None else len(entry.prices)
+        if sort == "price":
+            start = (max(lo, entry.after(*cursor_values)) if cursor else lo) + skip
+            ids = entry.ids[start:min(hi, start + limit + 1)].tolist()
+        else:
+            in_range = entry.ids[lo:hi]
+    if sort == "id":
+        after = cursor_values[0] if cursor else None
+        candidates = (item_id for item_id in in_range if after is None or item_id > after)
+        ids = heapq.nsmallest(skip + limit + 1, candidates)[skip:]
+
+    conditions = [models.Item.user_id == user_id, models.Item.id.in_(ids)]
+    if min_price is not None:
+        conditions.append(models.Item.price >= min_price)
+    if max_price is not None:
+        conditions.append(models.Item.price <= max_price)
+    rows = {row.id: row for row in db.execute(select(*items_logic.select_columns(fields, sort)).where(*conditions))}
+    if len(rows) < len(ids):
+        # Deleted or repriced by another worker since the version was read:
+        # skipping the row would shorten the page and end the pagination early.
+        return items_logic.get_items_page(db, user_id, limit=limit, sort=sort, fields=fields, **filters)
+    page = [rows[item_id] for item_id in ids]
+    next_cursor = items_logic.encode_cursor(sort, page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+price_index = PriceIndex(PRICE_INDEX_MAX_BYTES)
+items_logic.change_listeners.append(price_index.apply)
@@ -1,11 +1,77 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import os
+import shutil
+import tempfile
+
+import orjson
+from dotenv import load_dotenv
+from fastapi import (
+    APIRouter, BackgroundTasks, Depends, File, Header, HTTPException, Query, Response, UploadFile, status
+)
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.dependencies import get_db, get_current_user
-from . import schemas, items_logic
+from app.database import run_db, session_factory_for
+from app.dependencies import get_db, get_current_user, get_read_db
+from . import schemas, items_logic, importer, stats, changes, price_index
+from .group_commit import GROUP_COMMIT_ENABLED, committer
+from .listing_cache import listing_cache
+from .single_flight import single_flight
 from ..auth.models import User
+from ..metrics import Histogram, timed
+
+load_dotenv()
+
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", 10000))
 
 router = APIRouter()
 
+serialization_seconds = Histogram(
+    "items_serialization_seconds", "Time spent encoding item listings", ["endpoint"]
+)
+
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def check_price_range(min_price: float | None, max_price: float | None):
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(
+            status_code=400, detail="min_price cannot be greater than max_price"
+        )
+
+
+def parse_fields(fields: str | None) -> tuple:
+    """Validate a sparse fieldset (?fields=id,name) and order it like ItemResponse."""
+    if not fields:
+        return items_logic.RESPONSE_FIELDS
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(items_logic.RESPONSE_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in items_logic.RESPONSE_FIELDS if name in requested)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires.
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def check_bulk_size(rows: list):
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ROWS} rows per bulk request",
+        )
+
 
 @router.post("/items/", response_model=schemas.ItemResponse, status_code=status.HTTP_201_CREATED)
 async def create_item(
@@ -13,7 +79,143 @@ async def create_item(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    return items_logic.create_item(db=db, item=item, user_id=current_user.id)
+    if GROUP_COMMIT_ENABLED:
+        return await committer.submit(db, current_user.id, item)
+    return await run_db(db, items_logic.create_item, item=item, user_id=current_user.id)
+
+
+@router.post(
+    "/items/bulk", response_model=list[schemas.BulkItemResult], status_code=status.HTTP_207_MULTI_STATUS
+)
+async def create_items(
+    items: list[schemas.ItemCreate],
+    atomic: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    check_bulk_size(items)
+    return await run_db(db, items_logic.create_items, items=items, user_id=current_user.id, atomic=atomic)
+
+
+@router.patch(
+    "/items/bulk", response_model=list[schemas.BulkItemResult], status_code=status.HTTP_207_MULTI_STATUS
+)
+async def update_items(
+    items: list[schemas.ItemPatch],
+    atomic: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    check_bulk_size(items)
+    return await run_db(db, items_logic.update_items, items=items, user_id=current_user.id, atomic=atomic)
+
+
+@router.delete(
+    "/items/bulk", response_model=list[schemas.BulkItemResult], status_code=status.HTTP_207_MULTI_STATUS
+)
+async def delete_items(
+    body: schemas.ItemBulkDelete,
+    atomic: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    check_bulk_size(body.ids)
+    return await run_db(db, items_logic.delete_items, ids=body.ids, user_id=current_user.id, atomic=atomic)
+
+
+@router.post(
+    "/items/import", response_model=schemas.ImportJobStatus, status_code=status.HTTP_202_ACCEPTED
+)
+async def import_items(
+    response: Response,
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    format: str = Query(None, pattern="^(ndjson|csv)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # The upload is closed once the response is sent, so the job reads its own copy.
+    spool = tempfile.TemporaryFile()
+    await run_in_threadpool(shutil.copyfileobj, file.file, spool)
+    spool.seek(0)
+
+    job = await run_db(
+        db,
+        importer.jobs.add,
+        importer.ImportJob(user_id=current_user.id, format=format or importer.guess_format(file.filename)),
+    )
+    background_tasks.add_task(importer.run_import, session_factory_for(db), job, spool)
+    response.headers["Location"] = f"/items/import/{job.id}"
+    return job
+
+
+@router.get("/items/import/{job_id}", response_model=schemas.ImportJobStatus)
+async def read_import_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    job = await run_db(db, importer.jobs.get, job_id)
+    if job is None or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@router.get("/items/stats", response_model=schemas.ItemStats)
+async def read_item_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    return await run_db(db, stats.get_stats, user_id=current_user.id)
+
+
+@router.get("/items/export", response_class=StreamingResponse)
+async def export_items(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    min_price: float = Query(None, ge=0),
+    max_price: float = Query(None, ge=0),
+    query: str = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    check_price_range(min_price, max_price)
+    rows = items_logic.export_items(
+        session_factory_for(db),
+        user_id=current_user.id,
+        format=format,
+        min_price=min_price,
+        max_price=max_price,
+        query=query,
+    )
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="items.{format}"'},
+    )
+
+
+@router.get("/items/changes", response_class=StreamingResponse)
+async def read_item_changes(
+    last_event_id: int = Query(None, ge=0),
+    last_event_id_header: int | None = Header(None, alias="Last-Event-ID", ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # Subscribe before replaying so nothing committed in between is missed.
+    subscription = changes.hub.subscribe(current_user.id)
+    resume_from = last_event_id_header if last_event_id_header is not None else last_event_id
+    backlog, reset_id = [], None
+    try:
+        if resume_from is not None:
+            backlog, reset_id = await run_db(db, changes.replay, user_id=current_user.id, last_event_id=resume_from)
+    except Exception:
+        changes.hub.unsubscribe(subscription)
+        raise
+    return StreamingResponse(
+        changes.event_stream(subscription, backlog, reset_id, resume_from or 0),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/items/", response_model=list[schemas.ItemResponse])
@@ -23,33 +225,92 @@ async def read_items(
     min_price: float = Query(None, ge=0),
     max_price: float = Query(None, ge=0),
     query: str = None,
-    db: Session = Depends(get_db),
+    sort: str = Query("id", pattern="^(id|price|rank)$"),
+    cursor: str = None,
+    fields: str = None,
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    if min_price is not None and max_price is not None and min_price > max_price:
+    check_price_range(min_price, max_price)
+    columns = parse_fields(fields)
+    if cursor and skip:
         raise HTTPException(
-            status_code=400, detail="min_price cannot be greater than max_price"
+            status_code=400, detail="skip cannot be combined with cursor"
         )
 
-    return items_logic.get_items(
-        db=db,
-        user_id=current_user.id,
-        skip=skip,
-        limit=limit,
-        min_price=min_price,
-        max_price=max_price,
-        query=query,
+    params = dict(
+        skip=skip, limit=limit, min_price=min_price, max_price=max_price, query=query, sort=sort, cursor=cursor
+    )
+    # Read the version before the page: a write in between only makes the ETag stale, never wrong.
+    version = await run_db(db, items_logic.get_collection_version, user_id=current_user.id)
+    etag = f'W/"items-{current_user.id}-{version}"'
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    # Pages are cached under the version they were read at, so a write by any
+    # worker makes them unreachable whichever cache backend is used.
+    cache_key = listing_cache.key(current_user.id, version, {**params, "fields": ",".join(columns)})
+    cached = listing_cache.get(cache_key)
+    if cached is not None:
+        return Response(content=cached["body"], media_type=ORJSONResponse.media_type, headers=cached["headers"])
+
+    async def load_page():
+        headers = {"ETag": etag}
+        rows, next_cursor = await run_db(
+            db,
+            price_index.get_items_page,
+            user_id=current_user.id,
+            version=version,
+            fields=columns,
+            **params,
+        )
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        # Rows come straight from typed columns, so they are encoded without
+        # building and validating an ItemResponse per row.
+        with timed(serialization_seconds, endpoint="read_items"):
+            body = orjson.dumps([dict(zip(columns, row)) for row in rows]).decode()
+        listing_cache.put(cache_key, body, headers)
+        return headers, body
+
+    # Concurrent identical requests at the same collection version share one
+    # query; the version also covers writes made by other workers.
+    headers, body = await single_flight.do(
+        single_flight.key("read_items", current_user.id, {**params, "fields": columns, "version": version}),
+        load_page,
     )
+    return Response(content=body, media_type=ORJSONResponse.media_type, headers=headers)
 
 
 @router.get("/items/{item_id}", response_model=schemas.ItemResponse)
 async def read_item(
     item_id: int,
-    db: Session = Depends(get_db),
+    fields: str = None,
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
-    item = items_logic.get_item(db=db, item_id=item_id, user_id=current_user.id)
-    return item
+    if if_none_match:
+        version = await run_db(db, items_logic.get_item_version, item_id=item_id, user_id=current_user.id)
+        etag = f'W/"item-{item_id}-{version}"'
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    columns = parse_fields(fields)
+
+    async def load_item():
+        row = await run_db(
+            db,
+            items_logic.get_item,
+            item_id=item_id,
+            user_id=current_user.id,
+            entities=items_logic.select_columns(columns + ("version",)),
+        )
+        return f'W/"item-{item_id}-{row.version}"', orjson.dumps(dict(zip(columns, row)))
+
+    etag, body = await single_flight.do(
+        single_flight.key("read_item", current_user.id, {"item_id": item_id, "fields": columns}), load_item
+    )
+    return Response(content=body, media_type=ORJSONResponse.media_type, headers={"ETag": etag})
 
 
 @router.put("/items/{item_id}", response_model=schemas.ItemResponse)
@@ -59,8 +320,8 @@ async def update_item(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    return items_logic.update_item(
-        db=db, item_id=item_id, item=item, user_id=current_user.id
+    return await run_db(
+        db, items_logic.update_item, item_id=item_id, item=item, user_id=current_user.id
     )
 
 
@@ -70,5 +331,5 @@ async def delete_item(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    items_logic.delete_item(db=db, item_id=item_id, user_id=current_user.id)
+    await run_db(db, items_logic.delete_item, item_id=item_id, user_id=current_user.id)
     return {"message": "Item deleted successfully"}
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, field_validator
 from typing import Optional
 
 
@@ -17,8 +17,65 @@ class ItemUpdate(ItemBase):
 
 
 class ItemResponse(ItemBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     user_id: int
 
-    class Config:
-        orm_mode = True
+
+class ItemPatch(BaseModel):
+    id: int
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+
+    @field_validator("name", "price")
+    @classmethod
+    def not_null(cls, value):
+        # Omit a field to leave it unchanged; only description can be cleared.
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+
+class ItemBulkDelete(BaseModel):
+    ids: list[int]
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: int
+    detail: Optional[str] = None
+
+
+class ImportRowError(BaseModel):
+    line: Optional[int] = None
+    error: str
+
+
+class ImportJobStatus(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    status: str
+    format: str
+    processed: int
+    imported: int
+    failed: int
+    errors: list[ImportRowError]
+
+
+class PriceBucket(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+    count: int
+
+
+class ItemStats(BaseModel):
+    count: int
+    sum: float
+    min: Optional[float] = None
+    max: Optional[float] = None
+    average: Optional[float] = None
+    histogram: list[PriceBucket]
@@ -0,0 +1,109 @@
+import re
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from . import models
+
+# Kept out of Base.metadata: the virtual table is managed by the DDL below,
+# this only describes it for queries.
+items_fts = Table(
+    "items_fts",
+    MetaData(),
+    Column("rowid", Integer),
+    Column("name", String),
+    Column("description", String),
+    Column("rank", Float),
+)
+
+FTS_DDL = [
+    "CREATE VIRTUAL TABLE items_fts USING fts5("
+    "name, description, content='items', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER items_fts_ai AFTER INSERT ON items BEGIN "
+    "INSERT INTO items_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER items_fts_ad AFTER DELETE ON items BEGIN "
+    "INSERT INTO items_fts(items_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER items_fts_au AFTER UPDATE OF name, description ON items BEGIN "
+    "INSERT INTO items_fts(items_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO items_fts(rowid, name, description) "
+    "VALUES (new.id, new.name, new.description); END",
+]
+
+_available = {}
+
+
+def fts_supported(connection) -> bool:
+    return connection.dialect.name == "sqlite"
+
+
+def index_exists(connection) -> bool:
+    row = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'items_fts'")
+    ).first()
+    return row is not None
+
+
+def drop_index(connection):
+    if not fts_supported(connection):
+        return
+    for trigger in ("items_fts_ai", "items_fts_ad", "items_fts_au"):
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    connection.execute(text("DROP TABLE IF EXISTS items_fts"))
+    _available.pop(connection.engine, None)
+
+
+def install_index(connection) -> bool:
+    """(Re)create the FTS table and its sync triggers, then index existing rows."""
+    if not fts_supported(connection):
+        return False
+    drop_index(connection)
+    try:
+        for statement in FTS_DDL:
+            connection.execute(text(statement))
+    except OperationalError:
+        # SQLite built without FTS5: searches keep using the LIKE fallback.
+        return False
+    rebuild_index(connection)
+    _available[connection.engine] = True
+    return True
+
+
+def rebuild_index(connection):
+    connection.execute(text("INSERT INTO items_fts(items_fts) VALUES ('rebuild')"))
+
+
+def ensure_index(connection) -> bool:
+    if not fts_supported(connection):
+        return False
+    if index_exists(connection):
+        return True
+    return install_index(connection)
+
+
+def fts_enabled(db: Session) -> bool:
+    engine = db.get_bind()
+    if engine not in _available:
+        _available[engine] = fts_supported(engine) and index_exists(db.connection())
+    return _available[engine]
+
+
+def match_expression(query: str) -> str | None:
+    """Turn free text into an FTS5 query where every word must match as a prefix."""
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+@event.listens_for(models.Item.__table__, "after_create")
+def _create_index(target, connection, **kw):
+    install_index(connection)
+
+
+@event.listens_for(models.Item.__table__, "before_drop")
+def _drop_index(target, connection, **kw):
+    drop_index(connection)
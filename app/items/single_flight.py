@@ -0,0 +1,69 @@
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+from ..metrics import Counter
+from . import items_logic
+from .listing_cache import normalize_params
+
+load_dotenv()
+
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+single_flight_requests = Counter(
+    "items_single_flight_requests_total", "Item reads by whether they ran or joined a query", ["endpoint", "result"]
+)
+
+
+class _LeaderCancelled(Exception):
+    """The request running the query went away; a waiting one takes over."""
+
+
+class SingleFlight:
+    """Lets concurrent identical reads of one user share a single in-flight query and its result.
+
+    Keys carry the user's write generation, bumped after every committed
+    write, so a read arriving after a write never joins a query that may
+    have started before it.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._generations = {}
+
+    def key(self, endpoint: str, user_id: int, params: dict) -> tuple:
+        return endpoint, user_id, self._generations.get(user_id, 0), normalize_params(params)
+
+    async def do(self, key: tuple, fn):
+        if not SINGLE_FLIGHT_ENABLED:
+            return await fn()
+        future = self._flights.get(key)
+        if future is not None:
+            single_flight_requests.inc(endpoint=key[0], result="coalesced")
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                return await self.do(key, fn)
+
+        single_flight_requests.inc(endpoint=key[0], result="leader")
+        future = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn()
+        except BaseException as exc:
+            future.set_exception(_LeaderCancelled() if isinstance(exc, asyncio.CancelledError) else exc)
+            # Mark the exception retrieved in case nobody joined.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
+
+    def invalidate(self, user_id: int):
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+
+single_flight = SingleFlight()
+items_logic.write_listeners.append(single_flight.invalidate)
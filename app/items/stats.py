@@ -0,0 +1,159 @@
+import math
+import os
+from bisect import bisect_right
+from collections import Counter
+
+from dotenv import load_dotenv
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.orm import Session
+from . import models
+
+load_dotenv()
+
+# Lower bounds of the histogram buckets; bucket 0 holds prices below the first bound.
+STATS_PRICE_BUCKETS = tuple(
+    float(bound) for bound in os.getenv("STATS_PRICE_BUCKETS", "0,10,50,100,500,1000").split(",")
+)
+
+
+def bucket_of(price: float) -> int:
+    return bisect_right(STATS_PRICE_BUCKETS, price)
+
+
+def apply_delta(db: Session, user_id: int, added=(), removed=()):
+    """Fold added/removed prices into the user's aggregates, in the caller's transaction.
+
+    Must run after the item rows themselves were flushed: removing the current
+    minimum or maximum re-reads it from the (user_id, price) index.
+    """
+    added = [price for price in added if price is not None]
+    removed = [price for price in removed if price is not None]
+    if not added and not removed:
+        return
+
+    stats = db.get(models.ItemStats, user_id, with_for_update=True)
+    if stats is None:
+        stats = models.ItemStats(user_id=user_id, count=0, total=0.0)
+        db.add(stats)
+    stats.count += len(added) - len(removed)
+    stats.total += sum(added) - sum(removed)
+
+    lost_extreme = removed and (
+        stats.min_price is None or min(removed) <= stats.min_price or max(removed) >= stats.max_price
+    )
+    if stats.count == 0:
+        stats.total, stats.min_price, stats.max_price = 0.0, None, None
+    elif lost_extreme:
+        db.flush()
+        stats.min_price, stats.max_price = db.execute(
+            select(func.min(models.Item.price), func.max(models.Item.price)).where(models.Item.user_id == user_id)
+        ).one()
+    elif added:
+        stats.min_price = min(added) if stats.min_price is None else min(stats.min_price, *added)
+        stats.max_price = max(added) if stats.max_price is None else max(stats.max_price, *added)
+
+    deltas = Counter(bucket_of(price) for price in added)
+    deltas.subtract(bucket_of(price) for price in removed)
+    for bucket, delta in deltas.items():
+        if delta == 0:
+            continue
+        changed = db.execute(
+            update(models.ItemPriceBucket)
+            .where(models.ItemPriceBucket.user_id == user_id, models.ItemPriceBucket.bucket == bucket)
+            .values(count=models.ItemPriceBucket.count + delta)
+        )
+        if changed.rowcount == 0:
+            db.add(models.ItemPriceBucket(user_id=user_id, bucket=bucket, count=delta))
+    db.flush()
+
+
+def get_stats(db: Session, user_id: int) -> dict:
+    stats = db.get(models.ItemStats, user_id)
+    buckets = dict(
+        db.execute(
+            select(models.ItemPriceBucket.bucket, models.ItemPriceBucket.count).where(
+                models.ItemPriceBucket.user_id == user_id, models.ItemPriceBucket.count > 0
+            )
+        ).all()
+    )
+    count = stats.count if stats else 0
+    bounds = (None,) + STATS_PRICE_BUCKETS + (None,)
+    return {
+        "count": count,
+        "sum": stats.total if stats else 0.0,
+        "min": stats.min_price if stats else None,
+        "max": stats.max_price if stats else None,
+        "average": stats.total / count if count else None,
+        "histogram": [
+            {"min": bounds[bucket], "max": bounds[bucket + 1], "count": buckets[bucket]}
+            for bucket in sorted(buckets)
+        ],
+    }
+
+
+def _bucket_expression():
+    return case(
+        *[(models.Item.price < bound, index) for index, bound in enumerate(STATS_PRICE_BUCKETS)],
+        else_=len(STATS_PRICE_BUCKETS),
+    )
+
+
+def rebuild_stats(db: Session, check_only: bool = False) -> list[int]:
+    """Recompute every user's aggregates from items; return the users whose stored ones were wrong."""
+    expected = {
+        user_id: {"count": count, "total": total or 0.0, "min_price": low, "max_price": high}
+        for user_id, count, total, low, high in db.execute(
+            select(
+                models.Item.user_id,
+                func.count(models.Item.price),
+                func.sum(models.Item.price),
+                func.min(models.Item.price),
+                func.max(models.Item.price),
+            )
+            .where(models.Item.price.is_not(None), models.Item.user_id.is_not(None))
+            .group_by(models.Item.user_id)
+        )
+    }
+    expected_buckets = {}
+    bucket = _bucket_expression()
+    for user_id, index, count in db.execute(
+        select(models.Item.user_id, bucket, func.count())
+        .where(models.Item.price.is_not(None), models.Item.user_id.is_not(None))
+        .group_by(models.Item.user_id, bucket)
+    ):
+        expected_buckets.setdefault(user_id, {})[index] = count
+
+    stored = {row.user_id: row for row in db.execute(select(models.ItemStats)).scalars()}
+    stored_buckets = {}
+    for row in db.execute(select(models.ItemPriceBucket).where(models.ItemPriceBucket.count != 0)).scalars():
+        stored_buckets.setdefault(row.user_id, {})[row.bucket] = row.count
+
+    mismatched = []
+    for user_id in sorted(set(expected) | set(stored)):
+        want = expected.get(user_id, {"count": 0, "total": 0.0, "min_price": None, "max_price": None})
+        have = stored.get(user_id)
+        same = have is not None and all(
+            _close(getattr(have, key), value) for key, value in want.items()
+        )
+        if (want["count"] or have is not None) and not (
+            same and expected_buckets.get(user_id, {}) == stored_buckets.get(user_id, {})
+        ):
+            mismatched.append(user_id)
+
+    if not check_only:
+        db.execute(delete(models.ItemPriceBucket))
+        db.execute(delete(models.ItemStats))
+        db.add_all(models.ItemStats(user_id=user_id, **values) for user_id, values in expected.items())
+        db.add_all(
+            models.ItemPriceBucket(user_id=user_id, bucket=index, count=count)
+            for user_id, counts in expected_buckets.items()
+            for index, count in counts.items()
+        )
+        db.commit()
+    return mismatched
+
+
+def _close(have, want) -> bool:
+    if have is None or want is None:
+        return have is want
+    return math.isclose(have, want, rel_tol=1e-9, abs_tol=1e-6)
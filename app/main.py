@@ -1,19 +1,56 @@
+import os
+
+from dotenv import load_dotenv
 from fastapi import FastAPI
-from .auth import models
-from app.database import engine
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from app import metrics
+from app.database import QUERY_DIAGNOSTICS, async_engine, engine, replica_engines
+from app.diagnostics import QueryDiagnosticsMiddleware
+from app.instrumentation import MetricsMiddleware, instrument_pool, instrument_queries
+from app.migrations import upgrade
+from .auth.password_pool import password_pool
 from .auth.routes import router as auth_router
+from .items import changes
+from .items.group_commit import committer
 from .items.routes import router as items_router
 
+load_dotenv()
+
+# Importing the app no longer touches the database: the schema is brought up
+# to date on startup, or once by `python -m app.server` before it forks.
+SCHEMA_UPGRADE_ON_STARTUP = os.getenv("SCHEMA_UPGRADE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
 
-app = FastAPI()
 
-models.Base.metadata.create_all(bind=engine)
+app = FastAPI(default_response_class=ORJSONResponse)
+if SCHEMA_UPGRADE_ON_STARTUP:
+    app.add_event_handler("startup", lambda: upgrade(engine))
+app.add_event_handler("startup", changes.backend.start)
+app.add_event_handler("startup", password_pool.calibrate)
+app.add_event_handler("shutdown", committer.drain)
+app.add_event_handler("shutdown", password_pool.shutdown)
 
 app.include_router(auth_router)
 app.include_router(items_router)
 
 
+if QUERY_DIAGNOSTICS != "off":
+    app.add_middleware(QueryDiagnosticsMiddleware)
+
+if metrics.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    instrument_queries()
+    instrument_pool(engine, "sync")
+    if async_engine is not None:
+        instrument_pool(async_engine.sync_engine, "async")
+    for index, replica in enumerate(replica_engines):
+        instrument_pool(replica, f"replica{index}")
+
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    def read_metrics():
+        return metrics.render()
+
+
 if __name__ == "__main__":
-    import uvicorn
+    from app.server import main
 
-    uvicorn.run(app)
+    raise SystemExit(main())
@@ -0,0 +1,57 @@
+import argparse
+
+from sqlalchemy import inspect
+
+from sqlalchemy.orm import Session
+
+from .database import Base, engine
+from .auth import models as auth_models  # noqa: F401  (registers the users table)
+from .items import models as items_models, search, stats
+
+
+def add_missing_columns(connection, table):
+    """ALTER TABLE ADD COLUMN for model columns an existing table predates."""
+    existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(connection.dialect)}"
+        if column.server_default is not None:
+            ddl += f" DEFAULT {column.server_default.arg}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+        connection.exec_driver_sql(ddl)
+
+
+def upgrade(bind=engine, rebuild_search: bool = False):
+    """Bring the schema up to date; safe to run on every start."""
+    had_stats = inspect(bind).has_table(items_models.ItemStats.__tablename__)
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as connection:
+        add_missing_columns(connection, items_models.Item.__table__)
+        # create_all skips indexes added to tables that already exist.
+        for index in items_models.Item.__table__.indexes:
+            index.create(connection, checkfirst=True)
+        if rebuild_search and search.index_exists(connection):
+            search.rebuild_index(connection)
+        else:
+            search.ensure_index(connection)
+    if not had_stats:
+        # Aggregates are only maintained incrementally from here on: seed them once.
+        with Session(bind=bind) as db:
+            stats.rebuild_stats(db)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create or upgrade the database schema.")
+    parser.add_argument(
+        "--rebuild-search",
+        action="store_true",
+        help="re-index every existing item in the full-text search table",
+    )
+    args = parser.parse_args(argv)
+    upgrade(rebuild_search=args.rebuild_search)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from .cache import CacheBackend, LocalCache, build_backend
+from .database import replica_engines
+from .items import items_logic
+from .metrics import Counter
+
+load_dotenv()
+
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", 5))
+# After a user's own write their reads stay on the primary this long, so they
+# never see a replica that has not caught up with it yet.
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+READ_YOUR_WRITES_MAX_USERS = int(os.getenv("READ_YOUR_WRITES_MAX_USERS", 100000))
+
+db_reads = Counter("db_reads_total", "Read sessions by the database serving them", ["target"])
+
+
+class ReplicaSet:
+    """Round-robin over replica engines, skipping those failing a periodic SELECT 1.
+
+    Recent writers are marked in a cache backend for read_your_writes seconds:
+    shared by every worker with CACHE_REDIS_URL, and expiring on its own.
+    """
+
+    def __init__(self, engines: list, health_interval: float, read_your_writes: float, backend: CacheBackend = None):
+        self.engines = list(engines)
+        self.sessionmakers = [sessionmaker(autocommit=False, autoflush=False, bind=bind) for bind in self.engines]
+        self.health_interval = health_interval
+        self.read_your_writes = read_your_writes
+        self._health = {}
+        self._next = 0
+        self.recent_writes = backend or LocalCache(READ_YOUR_WRITES_MAX_USERS)
+        self._lock = threading.Lock()
+
+    def healthy(self, index: int) -> bool:
+        now = time.monotonic()
+        checked_at, ok = self._health.get(index, (None, False))
+        if checked_at is not None and now - checked_at < self.health_interval:
+            return ok
+        try:
+            with self.engines[index].connect() as conn:
+                conn.execute(text("SELECT 1"))
+            ok = True
+        except Exception:
+            ok = False
+        self._health[index] = (now, ok)
+        return ok
+
+    def choose(self):
+        """Index of the next healthy replica, or None to read from the primary."""
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % max(len(self.engines), 1)
+        for offset in range(len(self.engines)):
+            index = (start + offset) % len(self.engines)
+            if self.healthy(index):
+                return index
+        return None
+
+    def session(self, user_id: int = None):
+        """A session on a replica, or None when user_id wrote recently or no replica is up."""
+        if user_id is not None and self.wrote_recently(user_id):
+            return None
+        index = self.choose()
+        return None if index is None else self.sessionmakers[index]()
+
+    def mark_write(self, user_id: int):
+        if self.engines:
+            self.recent_writes.set(str(user_id), 1, self.read_your_writes)
+
+    def wrote_recently(self, user_id: int) -> bool:
+        return self.recent_writes.get(str(user_id)) is not None
+
+
+replicas = ReplicaSet(
+    replica_engines,
+    REPLICA_HEALTH_INTERVAL,
+    READ_YOUR_WRITES_SECONDS,
+    build_backend("recent-writes:", READ_YOUR_WRITES_MAX_USERS),
+)
+items_logic.write_listeners.append(replicas.mark_write)
@@ -0,0 +1,148 @@
+"""Production launcher: migrate once, import the app once, then fork the workers.
+
+    python -m app.server --workers 4 --host 0.0.0.0 --port 8000
+"""
+import argparse
+import importlib.util
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# More than one worker needs the caches and the change feed shared through Redis.
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", 1))
+# Seconds a stopping worker waits for in-flight requests before closing them.
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", 30))
+# A worker dying sooner than this after its start is replaced only after this
+# delay, so a crash on startup does not turn into a fork loop.
+SERVER_RESTART_DELAY = float(os.getenv("SERVER_RESTART_DELAY", 1))
+
+# Worker exit status when the app's startup failed (uvicorn's own code for it);
+# replacing such a worker would only fail again, so the server stops instead.
+STARTUP_FAILURE = 3
+
+
+def report(message: str):
+    print(f"[{os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+def pick(preferred: str, fallback: str) -> str:
+    return preferred if importlib.util.find_spec(preferred) is not None else fallback
+
+
+def serve(app, sock, loop: str, http: str, forked_at: float) -> int:
+    import uvicorn
+    from app.database import engine, replica_engines
+
+    # Pooled connections opened before the fork belong to the parent.
+    for bind in [engine, *replica_engines]:
+        bind.dispose(close=False)
+    app.add_event_handler("startup", lambda: report(f"worker ready in {time.perf_counter() - forked_at:.3f}s"))
+    config = uvicorn.Config(
+        app, loop=loop, http=http, lifespan="on", timeout_graceful_shutdown=SERVER_GRACEFUL_TIMEOUT
+    )
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+    return 0 if server.started else STARTUP_FAILURE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    args = parser.parse_args(argv)
+
+    from app.cache import CACHE_REDIS_URL
+    from app.items.changes import CHANGES_REDIS_URL
+
+    # Caches, read-your-writes markers and change feed events live in each
+    # worker's memory unless shared through Redis.
+    if args.workers > 1 and not (CACHE_REDIS_URL and CHANGES_REDIS_URL):
+        parser.error("more than one worker requires CACHE_REDIS_URL and CHANGES_REDIS_URL")
+
+    started = time.perf_counter()
+    from app.migrations import upgrade
+
+    upgrade()
+    migrated = time.perf_counter()
+    # Workers skip the startup migration, it already ran here.
+    os.environ["SCHEMA_UPGRADE_ON_STARTUP"] = "false"
+    from app.main import app
+
+    loop, http = pick("uvloop", "asyncio"), pick("httptools", "h11")
+    report(
+        f"migrated in {migrated - started:.3f}s, imported app in {time.perf_counter() - migrated:.3f}s"
+        f" (loop={loop}, http={http}, workers={args.workers})"
+    )
+
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.set_inheritable(True)
+
+    children = {}
+    stopping = False
+
+    def spawn():
+        forked_at = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            # Never return into the parent's supervisor loop or run its atexit handlers.
+            try:
+                code = serve(app, sock, loop, http, forked_at)
+            except BaseException:
+                traceback.print_exc()
+                os._exit(1)
+            else:
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        # A terminal's Ctrl-C already reaches every worker; SIGTERM is relayed
+        # so each one stops accepting and drains its in-flight requests.
+        if signum == signal.SIGTERM:
+            for pid in children:
+                os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(args.workers):
+        spawn()
+
+    status = 0
+    while children:
+        pid, code = os.wait()
+        started_at = children.pop(pid, None)
+        if started_at is None:
+            continue
+        code = os.waitstatus_to_exitcode(code)
+        if stopping:
+            status = status or code
+            continue
+        if code == STARTUP_FAILURE:
+            report(f"worker {pid} failed to start, stopping the server")
+            stop(signal.SIGTERM, None)
+            status = code
+            continue
+        report(f"worker {pid} exited unexpectedly ({code}), starting a replacement")
+        if time.monotonic() - started_at < SERVER_RESTART_DELAY:
+            time.sleep(SERVER_RESTART_DELAY)
+        if not stopping:
+            spawn()
+    report("all workers stopped")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
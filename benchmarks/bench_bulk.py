@@ -0,0 +1,31 @@
+"""Compare item ingestion throughput: one POST /items/ per row vs POST /items/bulk.
+
+    python -m benchmarks.bench_bulk --rows 2000
+"""
+import argparse
+
+from benchmarks.common import make_client, timed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    client, headers = make_client()
+    rows = [{"name": f"Bench item {i}", "description": "benchmark", "price": float(i % 500)} for i in range(args.rows)]
+
+    def single():
+        for row in rows:
+            client.post("/items/", json=row, headers=headers)
+
+    def bulk():
+        client.post("/items/bulk", json=rows, headers=headers)
+
+    for label, fn in (("single", single), ("bulk", bulk)):
+        _, elapsed = timed(fn)
+        print(f"{label:>6}: {args.rows} rows in {elapsed:.3f}s ({args.rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
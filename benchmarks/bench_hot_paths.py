@@ -0,0 +1,126 @@
+"""Throughput and p50/p95/p99 latency of the auth and items hot paths at several catalog sizes.
+
+    python -m benchmarks.bench_hot_paths --sizes 1000,100000 --output results.json
+    python -m benchmarks.bench_hot_paths --baseline benchmarks/baseline.json
+
+Runs in-process by default; pass --url and --db to measure a local uvicorn
+started with DATABASE_URL=sqlite:///<db>. Exits 1 when a scenario regressed
+against the baseline by more than --tolerance.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, select
+
+from benchmarks.common import compare, make_client, save_results, summarize
+from benchmarks.seed import WORDS, seed_items
+
+
+def run(client, requests: list, warmup: int, responses: list = None) -> dict:
+    """Send (method, url, kwargs) requests in order, timing each one.
+
+    The first warmup requests are sent once untimed beforehand, so only use it
+    for reads.
+    """
+    for method, url, kwargs in requests[:warmup]:
+        client.request(method, url, **kwargs)
+    latencies = []
+    started = time.perf_counter()
+    for method, url, kwargs in requests:
+        start = time.perf_counter()
+        response = client.request(method, url, **kwargs)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {url} -> {response.status_code}: {response.text}")
+        if responses is not None:
+            responses.append(response.json())
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def scenarios(headers: dict, item_ids: list, count: int, rng: random.Random):
+    """Yield (name, requests, warmup, responses) per scenario, lazily so writes can chain."""
+    yield "token", [
+        ("POST", "/token", {"data": {"username": "bench", "password": "bench"}}) for _ in range(count)
+    ], 5, None
+    yield "read_item", [
+        ("GET", f"/items/{rng.choice(item_ids)}", {"headers": headers}) for _ in range(count)
+    ], 5, None
+    # Ranges and pages vary per request so the listing cache rarely answers.
+    ranges = [sorted((rng.uniform(0, 1000), rng.uniform(0, 1000))) for _ in range(count)]
+    yield "list_filtered", [
+        ("GET", "/items/", {"headers": headers, "params": {"min_price": low, "max_price": high, "limit": 50}})
+        for low, high in ranges
+    ], 5, None
+    yield "list_search", [
+        ("GET", "/items/", {"headers": headers, "params": {"query": rng.choice(WORDS), "limit": 50, "skip": i}})
+        for i in range(count)
+    ], 5, None
+
+    created = []
+    yield "create", [
+        ("POST", "/items/", {"headers": headers, "json": {"name": f"Bench {i}", "price": float(i)}})
+        for i in range(count)
+    ], 0, created
+    yield "update", [
+        ("PUT", f"/items/{item['id']}", {"headers": headers, "json": {"name": "Updated", "price": 1.0}})
+        for item in created
+    ], 0, None
+    yield "delete", [("DELETE", f"/items/{item['id']}", {"headers": headers}) for item in created], 0, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000", help="comma separated catalog sizes, e.g. 1000,100000,1000000")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--db", help="SQLite file the app (or --url server) uses; a temp file by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    if args.url and not args.db:
+        parser.error("--url needs --db to seed the server's database")
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+    client, headers = make_client(db_path, url=args.url)
+    from app.auth.models import User
+    from app.items.models import Item
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.connect() as conn:
+        user_id = conn.scalar(select(User.id).where(User.username == "bench"))
+
+    rng = random.Random(args.seed)
+    results = {}
+    seeded = 0
+    for size in sorted(int(size) for size in args.sizes.split(",")):
+        started = time.perf_counter()
+        seeded += seed_items(engine, user_id, size - seeded, seed=args.seed + size)
+        print(f"seeded {seeded:,} items in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        with engine.connect() as conn:
+            item_ids = conn.scalars(select(Item.id).where(Item.user_id == user_id).limit(10_000)).all()
+
+        for name, requests, warmup, responses in scenarios(headers, item_ids, args.requests, rng):
+            summary = run(client, requests, warmup, responses)
+            results[f"{name}@{size}"] = summary
+            print(
+                f"{name + '@' + str(size):>22}: {summary['throughput']:8.1f} req/s"
+                f"  p50 {summary['p50']:7.2f}  p95 {summary['p95']:7.2f}  p99 {summary['p99']:7.2f} ms"
+            )
+
+    save_results(args.output, results)
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
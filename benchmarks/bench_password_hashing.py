@@ -0,0 +1,47 @@
+"""bcrypt hashes per second per core at each cost, and the cost calibration would pick here.
+
+    python -m benchmarks.bench_password_hashing --min-rounds 8 --max-rounds 14 --workers 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.auth.utils import PASSWORD_HASH_TARGET_MS, calibrate_bcrypt_rounds, get_password_hash
+
+
+def hash_many(rounds: int, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        get_password_hash("benchmark", rounds=rounds)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--min-rounds", type=int, default=8)
+    parser.add_argument("--max-rounds", type=int, default=14)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seconds", type=float, default=2, help="approximate time spent per cost")
+    parser.add_argument("--target-ms", type=float, default=PASSWORD_HASH_TARGET_MS)
+    args = parser.parse_args(argv)
+
+    hash_many(4, 1)  # loads the bcrypt backend
+    with ProcessPoolExecutor(args.workers) as pool:
+        for rounds in range(args.min_rounds, args.max_rounds + 1):
+            single = hash_many(rounds, 3) / 3
+            count = max(1, int(args.seconds / single))
+            started = time.perf_counter()
+            list(pool.map(hash_many, [rounds] * args.workers, [count] * args.workers))
+            elapsed = time.perf_counter() - started
+            per_second = count * args.workers / elapsed
+            print(
+                f"cost {rounds:>2}: {single * 1e3:8.1f} ms/hash  {per_second / args.workers:8.1f} hashes/s/core"
+                f"  {per_second:8.1f} hashes/s on {args.workers} workers"
+            )
+    rounds = calibrate_bcrypt_rounds(args.target_ms, args.min_rounds, args.max_rounds)
+    print(f"calibrated cost for {args.target_ms:.0f} ms: {rounds}")
+
+
+if __name__ == "__main__":
+    main()
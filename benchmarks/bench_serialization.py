@@ -0,0 +1,60 @@
+"""Per-item cost of serving a listing page: ORM + ItemResponse validation + json vs column tuples + orjson.
+
+    python -m benchmarks.bench_serialization --items 1000 --repeat 20
+"""
+import argparse
+import json
+import os
+import tempfile
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import timed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from app.auth.models import User
+    from app.items import items_logic, models, schemas
+    from app.migrations import upgrade
+
+    engine = create_engine(f"sqlite:///{path}")
+    upgrade(engine)
+    with sessionmaker(bind=engine)() as db:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        rows = [
+            {"name": f"Item {i}", "description": "benchmark row", "price": float(i), "user_id": user.id}
+            for i in range(args.items)
+        ]
+        db.execute(insert(models.Item), rows)
+        db.commit()
+        fields = tuple(schemas.ItemResponse.model_fields)
+
+        def orm_path():
+            items = items_logic.get_items(db, user.id, limit=args.items)
+            validated = [schemas.ItemResponse.model_validate(item) for item in items]
+            return json.dumps(jsonable_encoder(validated)).encode()
+
+        def column_path():
+            rows = items_logic.get_items(db, user.id, limit=args.items, entities=items_logic.select_columns(fields))
+            return orjson.dumps([dict(zip(fields, row)) for row in rows])
+
+        assert json.loads(orm_path()) == json.loads(column_path())
+        for label, fn in (("orm + validation + json", orm_path), ("columns + orjson", column_path)):
+            best = min(timed(fn)[1] for _ in range(args.repeat))
+            print(f"{label:>24}: {best * 1e6 / args.items:7.2f} us/item ({best * 1e3:.1f} ms per {args.items})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Concurrent read/write throughput of SQLite under the default and tuned engine profiles.
+
+    python -m benchmarks.bench_sqlite_concurrency --readers 8 --writers 2 --seconds 5
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import OperationalError
+
+from benchmarks.seed import generate_items
+
+
+def measure(profile: str, readers: int, writers: int, seconds: float, items: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-"), f"{profile}.db")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{path}")
+    from app.database import make_engine
+    from app.items.models import Item
+    from app.migrations import upgrade
+
+    engine = make_engine(f"sqlite:///{path}", profile=profile)
+    upgrade(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Item), list(generate_items(items, user_id=1)))
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    rows = generate_items(10**9, user_id=1, seed=1)
+
+    def worker(write: bool):
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            try:
+                with engine.begin() as conn:
+                    if write:
+                        with lock:
+                            row = next(rows)
+                        conn.execute(insert(Item), row)
+                    else:
+                        conn.execute(
+                            select(Item.id, Item.name, Item.price).where(Item.price.between(100, 150)).limit(50)
+                        ).all()
+                done += 1
+            except OperationalError:
+                # "database is locked" once a writer waited out the busy timeout.
+                errors += 1
+        with lock:
+            counts["writes" if write else "reads"] += done
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=worker, args=(False,)) for _ in range(readers)]
+    threads += [threading.Thread(target=worker, args=(True,)) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--items", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    for profile in ("default", "tuned"):
+        counts = measure(profile, args.readers, args.writers, args.seconds, args.items)
+        print(
+            f"{profile:>8}: {counts['reads'] / args.seconds:9,.0f} reads/s"
+            f"  {counts['writes'] / args.seconds:7,.0f} writes/s  {counts['errors']} lock errors"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+
+
+def make_client(db_path: str = None, url: str = None):
+    """Start the app in-process on a throwaway SQLite file and log a user in.
+
+    With url, talk to a running server instead; db_path should then be the
+    file that server was started on.
+    """
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    if url:
+        import httpx
+
+        client = httpx.Client(base_url=url)
+    else:
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        client = TestClient(app)
+        client.__enter__()
+    client.post("/register", json={"email": "bench@example.com", "username": "bench", "password": "bench"})
+    token = client.post("/token", data={"username": "bench", "password": "bench"}).json()["access_token"]
+    return client, {"Authorization": f"Bearer {token}"}
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def summarize(latencies: list, elapsed: float) -> dict:
+    """Throughput and latency percentiles (in milliseconds) of one scenario."""
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50": cuts[49] * 1e3,
+        "p95": cuts[94] * 1e3,
+        "p99": cuts[98] * 1e3,
+    }
+
+
+def save_results(path: str, results: dict):
+    with open(path, "w") as out:
+        machine = {"platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count()}
+        json.dump({"python": platform.python_version(), **machine, "results": results}, out, indent=2)
+
+
+def compare(results: dict, baseline_path: str, tolerance: float) -> list:
+    """Scenarios whose p95 grew or throughput fell by more than tolerance against the baseline."""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if current["p95"] > before["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95']:.2f} -> {current['p95']:.2f} ms")
+        if current["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput']:.0f} -> {current['throughput']:.0f} req/s")
+    return regressions
@@ -0,0 +1,80 @@
+"""Deterministic item generators for seeding benchmark databases with up to millions of rows.
+
+    python -m benchmarks.seed bench.db --items 1000000
+"""
+import argparse
+import random
+from itertools import islice
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+WORDS = (
+    "alpha", "bravo", "cobalt", "delta", "ember", "falcon", "granite", "harbor", "indigo", "juniper",
+    "kestrel", "lumen", "meadow", "nimbus", "onyx", "pepper", "quartz", "raven", "saffron", "tundra",
+)
+SEED_BATCH_SIZE = 50_000
+
+
+def generate_items(count: int, user_id: int, seed: int = 0):
+    """Yield count item rows; the same seed always yields the same rows."""
+    rng = random.Random(seed)
+    for i in range(count):
+        words = rng.sample(WORDS, 3)
+        yield {
+            "name": f"{words[0].title()} {words[1]} {i}",
+            "description": f"{words[2]} benchmark item",
+            "price": round(rng.uniform(0, 1000), 2),
+            "user_id": user_id,
+        }
+
+
+def seed_items(engine, user_id: int, count: int, seed: int = 0, batch_size: int = SEED_BATCH_SIZE) -> int:
+    """Bulk insert generated items (one transaction per batch), then rebuild their stats."""
+    from app.items import models, stats
+
+    rows = generate_items(count, user_id, seed)
+    inserted = 0
+    while batch := list(islice(rows, batch_size)):
+        with engine.begin() as conn:
+            conn.execute(insert(models.Item), batch)
+        inserted += len(batch)
+    # Rows written here bypass items_logic, so recompute the aggregates it maintains.
+    with Session(bind=engine) as db:
+        stats.rebuild_stats(db)
+    return inserted
+
+
+def ensure_user(engine, username: str = "bench", password: str = "bench") -> int:
+    from app.auth.models import User
+    from app.auth.utils import get_password_hash
+
+    with engine.begin() as conn:
+        user_id = conn.scalar(select(User.id).where(User.username == username))
+        if user_id is None:
+            user_id = conn.scalar(
+                insert(User)
+                .values(username=username, email=f"{username}@example.com", hashed_password=get_password_hash(password))
+                .returning(User.id)
+            )
+    return user_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("database", help="SQLite file to seed")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--username", default="bench")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from app.migrations import upgrade
+
+    engine = create_engine(f"sqlite:///{args.database}")
+    upgrade(engine)
+    user_id = ensure_user(engine, args.username)
+    print(f"Seeded {seed_items(engine, user_id, args.items, args.seed):,} items for {args.username}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,25 @@
+import os
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+# Fail any request that repeats one statement shape (N+1) instead of only warning.
+os.environ.setdefault("QUERY_DIAGNOSTICS", "strict")
+# The test client's startup would otherwise migrate the DATABASE_URL database;
+# the fixtures build the test schema themselves.
+os.environ.setdefault("SCHEMA_UPGRADE_ON_STARTUP", "false")
+
 from app.main import app
-from app.database import Base
+from app.auth.principal_cache import principal_cache
+from app.database import Base, diagnose
 from app.dependencies import get_db
+from app.items.listing_cache import listing_cache
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+diagnose(engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Primary fixture for database session management
@@ -29,3 +40,10 @@ def client(fakedb):
     app.dependency_overrides[get_db] = lambda: fakedb
     with TestClient(app) as test_app:
         yield test_app
+
+# Test helpers write rows directly, bypassing the invalidation done by items_logic
+@pytest.fixture(autouse=True)
+def reset_caches():
+    principal_cache.backend.clear()
+    listing_cache.backend.clear()
+    yield
@@ -0,0 +1,37 @@
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+# "SCAN items" (optionally "USING [COVERING] INDEX") walks the whole table or
+# index; virtual-table scans such as items_fts are answered by the FTS index.
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?! VIRTUAL TABLE)")
+
+
+@contextmanager
+def capture_statements(engine):
+    """Record every (statement, parameters) pair executed on engine."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def full_table_scans(engine, statement, parameters, tables=("items",)):
+    """Return the EXPLAIN QUERY PLAN details that scan one of tables end to end."""
+    with engine.connect() as connection:
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        found = FULL_SCAN.match(detail)
+        if found and found.group(1) in tables:
+            scans.append(detail)
+    return scans
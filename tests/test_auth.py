@@ -70,3 +70,106 @@ def test_expired_token(client, fakedb):
     response = client.get("/items/", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
     assert response.json() == {"detail": "Could not validate credentials"}
+
+# Test that a saturated password pool sheds load with 503 and Retry-After
+def test_password_pool_backpressure(client, fakedb, monkeypatch):
+    from app.auth.password_pool import password_pool
+
+    create_test_user(fakedb, username=USERNAME, password=PASSWORD, email=EMAIL)
+    monkeypatch.setattr(password_pool, "max_pending", 0)
+
+    response = client.post("/token", data={"username": USERNAME, "password": PASSWORD})
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == str(password_pool.retry_after)
+
+# Test that password hashing latency is exported on /metrics
+def test_password_metrics_exposed(client, fakedb):
+    create_test_user(fakedb, username=USERNAME, password=PASSWORD, email=EMAIL)
+    client.post("/token", data={"username": USERNAME, "password": PASSWORD})
+
+    body = client.get("/metrics").text
+    assert 'password_hash_seconds_count{op="verify"}' in body
+    assert "password_pool_queue_depth 0" in body
+
+# Test that repeated requests with the same token are served from the principal cache
+def test_principal_cache_skips_user_lookup(client, fakedb):
+    from sqlalchemy import event
+
+    user = create_test_user(fakedb, username=USERNAME, password=PASSWORD, email=EMAIL)
+    token = create_access_token(data={"sub": user.username})
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/items/", headers=headers).status_code == status.HTTP_200_OK
+
+    statements = []
+    engine = fakedb.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/items/", headers=headers).status_code == status.HTTP_200_OK
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert not any("FROM users" in statement for statement in statements)
+
+    # Replacing the user invalidates the cached principal
+    new_user = create_test_user(fakedb, username=USERNAME, password=PASSWORD, email=EMAIL)
+    response = client.post("/items/", json={"name": "Mine", "price": 1.0}, headers=headers)
+    assert response.json()["user_id"] == new_user.id
+
+# Test that cached principals are dropped on commit, not on flush or rollback
+def test_principal_cache_invalidated_on_commit(fakedb):
+    from app.auth.principal_cache import principal_cache
+
+    user = create_test_user(fakedb, username="cached", email="cached@example.com")
+    principal_cache.put(user)
+    user.email = "flushed@example.com"
+    fakedb.flush()
+    assert principal_cache.get("cached") is not None
+    fakedb.rollback()
+    assert principal_cache.get("cached") is not None
+
+    user.email = "committed@example.com"
+    fakedb.commit()
+    assert principal_cache.get("cached") is None
+
+# Test the principal cache against a stand-in for the shared backend
+def test_principal_cache_shared_backend():
+    import time
+    from app.auth.models import User
+    from app.auth.principal_cache import PrincipalCache
+    from app.cache import RedisCache
+    from tests.utils import FakeRedis
+
+    cache = PrincipalCache(RedisCache(FakeRedis()), ttl=60)
+    cache.put(User(id=7, username="shared", email="shared@example.com"))
+    assert cache.get("shared").id == 7
+
+    cache.invalidate("shared")
+    assert cache.get("shared") is None
+
+    # Entries never outlive the token expiry
+    cache.put(User(id=7, username="shared", email="shared@example.com"), expires_at=time.time() - 1)
+    assert cache.get("shared") is None
+
+# Test that a login rewrites a hash stored below the current bcrypt cost
+def test_login_rehashes_weaker_password_hash(client, fakedb, monkeypatch):
+    from app.auth.password_pool import password_pool
+    from app.auth.utils import get_password_hash
+
+    user = create_test_user(fakedb, username=USERNAME, password=PASSWORD, email=EMAIL)
+    user.hashed_password = get_password_hash(PASSWORD, rounds=4)
+    fakedb.commit()
+    monkeypatch.setattr(password_pool, "rounds", 5)
+
+    response = client.post("/token", data={"username": USERNAME, "password": PASSWORD})
+    assert response.status_code == status.HTTP_200_OK
+    fakedb.refresh(user)
+    assert user.hashed_password.startswith("$2b$05$")
+
+# Test that calibration stays within bounds and scales with the target latency
+def test_calibrate_bcrypt_rounds(monkeypatch):
+    from app.auth import utils
+
+    monkeypatch.setattr(utils, "time_hash", lambda rounds: 0.01 * 2 ** (rounds - 4))
+    assert utils.calibrate_bcrypt_rounds(80, 4, 12) == 7
+    assert utils.calibrate_bcrypt_rounds(5, 4, 12) == 4
+    assert utils.calibrate_bcrypt_rounds(10_000, 4, 12) == 12
@@ -0,0 +1,19 @@
+from sqlalchemy import text
+
+from app.database import make_engine
+
+# Test that the tuned profile puts SQLite in WAL mode with its pragmas and a sized pool
+def test_tuned_sqlite_profile(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'tuned.db'}", profile="tuned")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2
+    assert engine.pool.size() == 5
+
+# Test that the default profile leaves SQLite's own settings alone
+def test_default_sqlite_profile(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'default.db'}", profile="default")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
@@ -0,0 +1,38 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.diagnostics import QueryDiagnosticsMiddleware, RepeatedQueryError, install_query_diagnostics
+
+
+def make_app(strict: bool):
+    engine = create_engine("sqlite://")
+    install_query_diagnostics(engine, slow_ms=0, repeat_threshold=3, strict=strict)
+    app = FastAPI()
+    app.add_middleware(QueryDiagnosticsMiddleware)
+
+    @app.get("/rows/{count}")
+    def read_rows(count: int):
+        with engine.connect() as conn:
+            return [conn.execute(text("SELECT :n"), {"n": n}).scalar() for n in range(count)]
+
+    return app
+
+# Test that repeated statement shapes within one request fail in strict mode
+def test_repeated_statement_raises_in_strict_mode():
+    client = TestClient(make_app(strict=True))
+    assert client.get("/rows/2").json() == [0, 1]
+    with pytest.raises(RepeatedQueryError, match="GET /rows/{count}"):
+        client.get("/rows/3")
+
+# Test that slow statements are logged with their parameters and route
+def test_slow_and_repeated_statements_logged(caplog):
+    client = TestClient(make_app(strict=False))
+    with caplog.at_level(logging.WARNING, logger="app.diagnostics"):
+        assert client.get("/rows/3").status_code == 200
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("Slow query" in message and "GET /rows/{count}" in message and "parameters: (0,)" in message for message in messages)
+    assert sum("N+1" in message for message in messages) == 1
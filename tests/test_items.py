@@ -154,3 +154,772 @@ def test_access_with_invalid_token(client):
     response = client.get("/items/", headers={"Authorization": "Bearer invalidtoken"})
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
     assert response.json() == {"detail": "Could not validate credentials"}
+
+# Test the item logic through an AsyncSession (DATABASE_MODE=async)
+def test_item_crud_with_async_session(tmp_path):
+    import asyncio
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from app.database import Base, run_db, to_async_url
+    from app.auth.models import User
+    from app.items import items_logic, schemas
+
+    async def scenario():
+        engine = create_async_engine(to_async_url(f"sqlite:///{tmp_path / 'async.db'}"))
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            user = User(username="asyncuser", email="async@example.com", hashed_password="x")
+            db.add(user)
+            await db.commit()
+
+            item = schemas.ItemCreate(name="Async Item", price=5.0)
+            created = await run_db(db, items_logic.create_item, item=item, user_id=user.id)
+            fetched = await run_db(db, items_logic.get_item, item_id=created.id, user_id=user.id)
+            assert fetched.name == "Async Item"
+
+            update = schemas.ItemUpdate(name="Async Item", price=7.5)
+            await run_db(db, items_logic.update_item, item_id=created.id, item=update, user_id=user.id)
+            items = await run_db(db, items_logic.get_items, user_id=user.id, min_price=7)
+            assert [i.price for i in items] == [7.5]
+
+            await run_db(db, items_logic.delete_item, item_id=created.id, user_id=user.id)
+            assert await run_db(db, items_logic.get_items, user_id=user.id) == []
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+# Test keyset pagination by price with filters
+def test_cursor_pagination(client, fakedb):
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    for price in [30.0, 10.0, 20.0, 10.0, 50.0, 40.0]:
+        create_test_item(fakedb, user_id=user.id, name="Paged", price=price)
+
+    seen = []
+    url = "/items/?sort=price&limit=2&min_price=10&max_price=40&query=Paged"
+    while url:
+        response = client.get(url, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        seen.extend((item["price"], item["id"]) for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        url = f"/items/?limit=2&min_price=10&max_price=40&query=Paged&cursor={cursor}" if cursor else None
+
+    assert [price for price, _ in seen] == [10.0, 10.0, 20.0, 30.0, 40.0]
+    assert seen == sorted(seen)
+
+# Test rejecting malformed cursors
+def test_invalid_cursor(client, fakedb):
+    import base64
+    import json
+
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+
+    response = client.get("/items/?cursor=not-a-cursor", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Invalid cursor"}
+    for values in (["id", "x"], ["id", None], ["price", "x", 1], ["price", 1.0, True]):
+        cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        response = client.get(f"/items/?min_price=1&cursor={cursor}", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+# Test full-text search: prefix matching, ranking and index sync on update/delete
+def test_full_text_search(client, fakedb):
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    lamp = create_test_item(fakedb, user_id=user.id, name="Desk lamp", description="A lamp, brass lamp", price=30.0)
+    create_test_item(fakedb, user_id=user.id, name="Lampshade", description="Linen", price=15.0)
+    create_test_item(fakedb, user_id=user.id, name="Chair", description="Oak chair next to the lamp", price=80.0)
+
+    response = client.get("/items/?query=lamp&sort=rank", headers=headers)
+    assert [item["name"] for item in response.json()][0] == "Desk lamp"
+    assert len(response.json()) == 3
+
+    client.put(f"/items/{lamp.id}", json={"name": "Desk light", "description": "Brass", "price": 30.0}, headers=headers)
+    names = [item["name"] for item in client.get("/items/?query=lamp", headers=headers).json()]
+    assert sorted(names) == ["Chair", "Lampshade"]
+
+    client.delete(f"/items/{lamp.id}", headers=headers)
+    assert client.get("/items/?query=brass", headers=headers).json() == []
+
+# Test the LIKE fallback used where FTS5 is unavailable
+def test_search_fallback_without_fts(client, fakedb, monkeypatch):
+    from app.items import search
+
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    create_test_items(fakedb, user_id=user.id)
+    monkeypatch.setattr(search, "fts_enabled", lambda db: False)
+
+    response = client.get("/items/?query=pensi", headers={"Authorization": f"Bearer {token}"})
+    assert [item["name"] for item in response.json()] == ["very very expensive Item"]
+
+# Test backfilling the search index for rows written before it existed
+def test_search_index_backfill(fakedb):
+    from app.items import items_logic, search
+    from app.migrations import upgrade
+
+    user = create_test_user(fakedb)
+    engine = fakedb.get_bind()
+    with engine.begin() as connection:
+        search.drop_index(connection)
+    create_test_item(fakedb, user_id=user.id, name="Backfilled widget")
+
+    upgrade(engine)
+    items = items_logic.get_items(fakedb, user_id=user.id, query="widg")
+    assert [item.name for item in items] == ["Backfilled widget"]
+
+# Test bulk create, patch and delete with per-row results
+def test_bulk_item_endpoints(client, fakedb, monkeypatch):
+    from app.items import items_logic
+
+    monkeypatch.setattr(items_logic, "BULK_CHUNK_SIZE", 2)
+    user = create_test_user(fakedb)
+    other = create_test_user(fakedb, username="other", email="other@example.com")
+    foreign = create_test_item(fakedb, user_id=other.id, name="Not mine")
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    rows = [{"name": f"Bulk {i}", "price": float(i)} for i in range(5)]
+    response = client.post("/items/bulk", json=rows, headers=headers)
+    assert response.status_code == status.HTTP_207_MULTI_STATUS
+    results = response.json()
+    assert [r["index"] for r in results] == list(range(5))
+    assert all(r["status"] == status.HTTP_201_CREATED for r in results)
+    ids = [r["id"] for r in results]
+    assert len(client.get("/items/?query=Bulk&limit=10", headers=headers).json()) == 5
+
+    patches = [{"id": ids[0], "price": 99.0}, {"id": ids[1], "name": "Renamed"}, {"id": foreign.id, "price": 1.0}]
+    results = client.patch("/items/bulk", json=patches, headers=headers).json()
+    assert [r["status"] for r in results] == [200, 200, 404]
+    assert client.get(f"/items/{ids[0]}", headers=headers).json()["price"] == 99.0
+    assert client.get(f"/items/{ids[1]}", headers=headers).json()["name"] == "Renamed"
+    response = client.patch("/items/bulk", json=[{"id": ids[0], "name": None, "price": None}], headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.get(f"/items/{ids[0]}", headers=headers).json()["price"] == 99.0
+
+    results = client.request("DELETE", "/items/bulk", json={"ids": ids[:3] + [foreign.id]}, headers=headers).json()
+    assert [r["status"] for r in results] == [204, 204, 204, 404]
+    assert len(client.get("/items/?query=Bulk&limit=10", headers=headers).json()) == 2
+    assert client.get(f"/items/{ids[1]}", headers=headers).status_code == status.HTTP_404_NOT_FOUND
+
+# Test that per-chunk statements of a large bulk write are not taken for an N+1
+def test_bulk_chunks_pass_strict_query_diagnostics(client, fakedb, monkeypatch):
+    from app.database import QUERY_REPEAT_THRESHOLD
+    from app.items import items_logic
+
+    monkeypatch.setattr(items_logic, "BULK_CHUNK_SIZE", 2)
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    rows = [{"name": f"Chunked {i}", "price": float(i)} for i in range(4 * QUERY_REPEAT_THRESHOLD)]
+
+    response = client.post("/items/bulk", json=rows, headers=headers)
+    assert response.status_code == status.HTTP_207_MULTI_STATUS
+    ids = [result["id"] for result in response.json()]
+    assert len(ids) == len(rows)
+    response = client.request("DELETE", "/items/bulk", json={"ids": ids}, headers=headers)
+    assert all(result["status"] == status.HTTP_204_NO_CONTENT for result in response.json())
+
+# Test the per-request row limit on bulk endpoints
+def test_bulk_row_limit(client, fakedb, monkeypatch):
+    from app.items import routes
+
+    monkeypatch.setattr(routes, "BULK_MAX_ROWS", 1)
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+
+    rows = [{"name": "One", "price": 1.0}, {"name": "Two", "price": 2.0}]
+    response = client.post("/items/bulk", json=rows, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+# Test streaming exports in NDJSON and CSV with the listing filters
+def test_export_items(client, fakedb, monkeypatch):
+    import csv
+    import json
+    from app.items import items_logic
+
+    monkeypatch.setattr(items_logic, "EXPORT_BATCH_SIZE", 2)
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(5):
+        create_test_item(fakedb, user_id=user.id, name=f"Export {i}", description="line, with comma", price=float(i))
+
+    response = client.get("/items/export?min_price=1", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["price"] for row in rows] == [1.0, 2.0, 3.0, 4.0]
+    assert set(rows[0]) == {"id", "name", "description", "price", "user_id"}
+
+    response = client.get("/items/export?format=csv&query=export&max_price=2", headers=headers)
+    assert response.headers["content-disposition"] == 'attachment; filename="items.csv"'
+    rows = list(csv.DictReader(response.text.splitlines()))
+    assert [row["name"] for row in rows] == ["Export 0", "Export 1", "Export 2"]
+    assert rows[0]["description"] == "line, with comma"
+
+# Test importing an NDJSON upload as a background job with row-level errors
+def test_import_items_ndjson(client, fakedb, monkeypatch):
+    from app.items import importer
+
+    monkeypatch.setattr(importer, "IMPORT_BATCH_SIZE", 2)
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    lines = [
+        '{"name": "Imported 1", "price": 1.5}',
+        '{"name": "Imported 2", "price": "abc"}',
+        "",
+        "not json",
+        '{"name": "Imported 3", "price": 3, "description": "d"}',
+        '{"name": "Imported 4", "price": 4}',
+    ]
+    upload = ("catalog.ndjson", "\n".join(lines).encode(), "application/x-ndjson")
+
+    response = client.post("/items/import", files={"file": upload}, headers=headers)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = client.get(response.headers["Location"], headers=headers).json()
+    assert job["status"] == "completed"
+    assert (job["processed"], job["imported"], job["failed"]) == (5, 3, 2)
+    assert [error["line"] for error in job["errors"]] == [2, 4]
+    names = [item["name"] for item in client.get("/items/?query=Imported", headers=headers).json()]
+    assert names == ["Imported 1", "Imported 3", "Imported 4"]
+
+# Test importing a CSV file and hiding jobs from other users
+def test_import_items_csv(client, fakedb):
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    upload = ("catalog.csv", b"name,description,price\nCsv one,,10\nCsv two,second,20\n", "text/csv")
+
+    response = client.post("/items/import", files={"file": upload}, headers=headers)
+    assert response.json()["status"] == "queued"
+    job = client.get(response.headers["Location"], headers=headers).json()
+    assert (job["format"], job["imported"], job["failed"]) == ("csv", 2, 0)
+    assert client.get("/items/?query=Csv", headers=headers).json()[0]["description"] is None
+
+    create_test_user(fakedb, username="other", email="other@example.com")
+    other_token = client.post("/token", data={"username": "other", "password": "password"}).json()["access_token"]
+    response = client.get(f"/items/import/{job['id']}", headers={"Authorization": f"Bearer {other_token}"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+# Test conditional GETs on single items and listings
+def test_etag_conditional_get(client, fakedb):
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    item = create_test_item(fakedb, user_id=user.id)
+
+    response = client.get(f"/items/{item.id}", headers=headers)
+    etag = response.headers["ETag"]
+    response = client.get(f"/items/{item.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+    listing = client.get("/items/", headers=headers)
+    collection_etag = listing.headers["ETag"]
+    response = client.get("/items/", headers={**headers, "If-None-Match": collection_etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    client.put(f"/items/{item.id}", json={"name": "Changed", "price": 1.0}, headers=headers)
+    response = client.get(f"/items/{item.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+    response = client.get("/items/", headers={**headers, "If-None-Match": collection_etag})
+    assert response.status_code == status.HTTP_200_OK
+
+    collection_etag = response.headers["ETag"]
+    client.post("/items/bulk", json=[{"name": "Bulk", "price": 2.0}], headers=headers)
+    response = client.get("/items/", headers={**headers, "If-None-Match": collection_etag})
+    assert response.status_code == status.HTTP_200_OK
+
+# Test the listing cache: hits, misses and per-user invalidation on writes
+def test_listing_cache(client, fakedb):
+    from app.items.listing_cache import listing_cache_requests
+
+    user = create_test_user(fakedb)
+    other = create_test_user(fakedb, username="other", email="other@example.com")
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    other_token = client.post("/token", data={"username": other.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    other_headers = {"Authorization": f"Bearer {other_token}"}
+    create_test_item(fakedb, user_id=user.id, name="Cached")
+
+    hits, misses = listing_cache_requests.value(result="hit"), listing_cache_requests.value(result="miss")
+    first = client.get("/items/?query=cached", headers=headers)
+    client.get("/items/", headers=other_headers)
+    second = client.get("/items/?query=%20Cached%20", headers=headers)
+    assert second.json() == first.json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert listing_cache_requests.value(result="miss") - misses == 2
+    assert listing_cache_requests.value(result="hit") - hits == 1
+
+    client.post("/items/", json={"name": "Cached too", "price": 1.0}, headers=headers)
+    assert len(client.get("/items/?query=cached", headers=headers).json()) == 2
+    client.get("/items/", headers=other_headers)
+    assert listing_cache_requests.value(result="hit") - hits == 2
+    assert "items_listing_cache_requests_total" in client.get("/metrics").text
+
+# Test that a write made by another worker is never hidden by a cached page
+def test_listing_cache_cross_worker_write(client, fakedb, monkeypatch):
+    from app.items import items_logic, schemas
+
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.post("/items/", json={"name": "Shared", "price": 1.0}, headers=headers)
+    first = client.get("/items/?query=Shared", headers=headers)
+    assert len(first.json()) == 1
+
+    # No listener of this process hears about it, as with a write on another worker.
+    monkeypatch.setattr(items_logic, "write_listeners", [])
+    items_logic.create_item(fakedb, schemas.ItemCreate(name="Shared too", price=2.0), user.id)
+    second = client.get("/items/?query=Shared", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert second.status_code == status.HTTP_200_OK
+    assert len(second.json()) == 2
+    client.request("DELETE", "/items/bulk", json={"ids": [item["id"] for item in second.json()]}, headers=headers)
+
+# Test the memory cap of the local cache backend
+def test_local_cache_memory_cap():
+    from app.cache import LocalCache
+
+    cache = LocalCache(max_entries=100, max_bytes=10, sizeof=len)
+    cache.set("a", "12345", ttl=60)
+    cache.set("b", "12345", ttl=60)
+    cache.get("a")
+    cache.set("c", "123", ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == "12345" and cache.get("c") == "123"
+    assert cache.size == 8
+    cache.set("huge", "x" * 11, ttl=60)
+    assert cache.get("huge") is None
+
+# Test sparse fieldsets narrowing both the SQL columns and the response
+def test_sparse_fieldsets(client, fakedb):
+    from tests.query_plan import capture_statements
+
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    item = create_test_item(fakedb, user_id=user.id, name="Sparse", description="Long text", price=5.0)
+    create_test_item(fakedb, user_id=user.id, name="Sparse 2", price=6.0)
+
+    with capture_statements(fakedb.get_bind()) as statements:
+        response = client.get("/items/?fields=name,id&sort=price&limit=1", headers=headers)
+    assert response.json() == [{"name": "Sparse", "id": item.id}]
+    assert "X-Next-Cursor" in response.headers
+    listing_sql = [sql for sql, _ in statements if "FROM items" in sql and "LIMIT" in sql]
+    assert listing_sql and all("description" not in sql for sql in listing_sql)
+
+    response = client.get(f"/items/{item.id}?fields=price", headers=headers)
+    assert response.json() == {"price": 5.0}
+    assert response.headers["ETag"] == client.get(f"/items/{item.id}", headers=headers).headers["ETag"]
+
+    response = client.get("/items/?fields=name,secret", headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Unknown fields: secret"}
+
+# Test per-user stats kept in step with single and bulk writes
+def test_item_stats(client, fakedb):
+    from app.items import stats
+
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/items/stats", headers=headers).json()["count"] == 0
+
+    first = client.post("/items/", json={"name": "A", "price": 5.0}, headers=headers).json()
+    bulk = client.post("/items/bulk", json=[{"name": "B", "price": 20.0}, {"name": "C", "price": 700.0}], headers=headers).json()
+    client.put(f"/items/{first['id']}", json={"name": "A", "price": 60.0}, headers=headers)
+    client.patch("/items/bulk", json=[{"id": bulk[1]["id"], "price": 15.0}], headers=headers)
+
+    body = client.get("/items/stats", headers=headers).json()
+    assert (body["count"], body["sum"], body["min"], body["max"]) == (3, 95.0, 15.0, 60.0)
+    assert body["average"] == pytest.approx(95.0 / 3)
+    assert body["histogram"] == [{"min": 10.0, "max": 50.0, "count": 2}, {"min": 50.0, "max": 100.0, "count": 1}]
+
+    client.delete(f"/items/{first['id']}", headers=headers)
+    client.request("DELETE", "/items/bulk", json={"ids": [bulk[0]["id"]]}, headers=headers)
+    body = client.get("/items/stats", headers=headers).json()
+    assert (body["count"], body["sum"], body["min"], body["max"]) == (1, 15.0, 15.0, 15.0)
+    assert user.id not in stats.rebuild_stats(fakedb, check_only=True)
+
+# Test that concurrent deletes of one user's items keep the stats exact
+def test_concurrent_deletes_keep_stats(tmp_path, monkeypatch):
+    import threading
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base, make_engine
+    from app.items import items_logic, schemas, stats
+
+    engine = make_engine(f"sqlite:///{tmp_path}/stats.db")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Session() as db:
+        ids = [items_logic.create_item(db, schemas.ItemCreate(name="Stat", price=float(i)), 1).id for i in range(4)]
+
+    # Line both deletes up right before the aggregates are read; when the first
+    # one already holds the write lock the other cannot get there, and the
+    # barrier gives up.
+    barrier = threading.Barrier(2, timeout=0.5)
+    apply_delta = stats.apply_delta
+
+    def racing_apply_delta(*args, **kwargs):
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        return apply_delta(*args, **kwargs)
+
+    monkeypatch.setattr(stats, "apply_delta", racing_apply_delta)
+
+    def delete(item_id):
+        with Session() as db:
+            items_logic.delete_item(db, item_id, 1)
+
+    threads = [threading.Thread(target=delete, args=(item_id,)) for item_id in ids[1:3]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with Session() as db:
+        assert stats.get_stats(db, 1)["count"] == 2
+        assert stats.rebuild_stats(db, check_only=True) == []
+    engine.dispose()
+
+# Test that the consistency check spots and repairs drifted stats
+def test_rebuild_item_stats(fakedb):
+    from app.items import stats
+
+    user = create_test_user(fakedb)
+    create_test_item(fakedb, user_id=user.id, price=42.0)
+    assert user.id in stats.rebuild_stats(fakedb, check_only=True)
+    assert user.id in stats.rebuild_stats(fakedb)
+    assert stats.rebuild_stats(fakedb, check_only=True) == []
+    assert stats.get_stats(fakedb, user.id)["max"] == 42.0
+
+# Test that request latency is labelled by route template and per-request SQL is counted
+def test_request_metrics(client, fakedb):
+    user = create_test_user(fakedb)
+    create_test_item(fakedb, user_id=user.id)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    client.get("/items/", headers={"Authorization": f"Bearer {token}"})
+
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/",status="200"}' in body
+    assert 'http_request_db_queries_count{route="/items/"}' in body
+    assert "db_query_duration_seconds_count" in body
+    assert 'auth_step_seconds_count{step="jwt_decode"}' in body
+    assert 'db_pool_checked_out{engine="sync"}' in body
+
+# Test that concurrent group-committed creates share batches and are all acknowledged
+def test_group_commit_batches_writes(fakedb):
+    import asyncio
+    from app.items import group_commit, schemas, stats
+
+    user = create_test_user(fakedb)
+    committer = group_commit.GroupCommitter(max_rows=8, max_delay_ms=50, queue_size=100, retry_after=1)
+    batches_before = group_commit.batch_rows.count()
+    count_before = stats.get_stats(fakedb, user.id)["count"]
+
+    async def create_many():
+        rows = await asyncio.gather(*[
+            committer.submit(fakedb, user.id, schemas.ItemCreate(name=f"Grouped {i}", price=float(i)))
+            for i in range(20)
+        ])
+        await committer.drain()
+        return rows
+
+    rows = asyncio.run(create_many())
+    assert [row["name"] for row in rows] == [f"Grouped {i}" for i in range(20)]
+    assert len({row["id"] for row in rows}) == 20
+    assert group_commit.batch_rows.count() - batches_before == 3
+    assert stats.get_stats(fakedb, user.id)["count"] - count_before == 20
+
+# Test that POST /items/ answers with the committed row in group commit mode
+def test_create_item_group_commit(client, fakedb, monkeypatch):
+    from app.items import routes
+
+    monkeypatch.setattr(routes, "GROUP_COMMIT_ENABLED", True)
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    response = client.post("/items/", json={"name": "Grouped", "price": 3.5}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == status.HTTP_201_CREATED
+    body = response.json()
+    assert (body["name"], body["price"], body["user_id"]) == ("Grouped", 3.5, user.id)
+    assert client.get(f"/items/{body['id']}", headers={"Authorization": f"Bearer {token}"}).json()["name"] == "Grouped"
+
+# Test that reads rotate over healthy replicas and stay on the primary after the user's writes
+def test_replica_read_routing(client, fakedb, tmp_path, monkeypatch):
+    import shutil
+    from sqlalchemy import create_engine, update
+    from app import dependencies, replicas
+    from app.items import items_logic
+    from app.items.models import Item
+
+    user = create_test_user(fakedb)
+    item = create_test_item(fakedb, user_id=user.id, name="primary")
+    engines = []
+    for name in ("first", "second"):
+        path = tmp_path / f"{name}.db"
+        shutil.copy(fakedb.get_bind().url.database, path)
+        replica = create_engine(f"sqlite:///{path}")
+        with replica.begin() as conn:
+            conn.execute(update(Item).where(Item.id == item.id).values(name=name))
+        engines.append(replica)
+    engines.append(create_engine(f"sqlite:///{tmp_path}/missing/down.db"))
+    replica_set = replicas.ReplicaSet(engines, health_interval=60, read_your_writes=60)
+    monkeypatch.setattr(dependencies, "replicas", replica_set)
+    monkeypatch.setattr(items_logic, "write_listeners", [*items_logic.write_listeners, replica_set.mark_write])
+
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    names = {client.get(f"/items/{item.id}", headers=headers).json()["name"] for _ in range(4)}
+    assert names == {"first", "second"}
+
+    client.put(f"/items/{item.id}", json={"name": "written", "price": 1.0}, headers=headers)
+    assert client.get(f"/items/{item.id}", headers=headers).json()["name"] == "written"
+
+    # Workers sharing a cache backend share the read-your-writes window.
+    other_worker = replicas.ReplicaSet(engines, health_interval=60, read_your_writes=60, backend=replica_set.recent_writes)
+    assert other_worker.wrote_recently(user.id)
+    assert not other_worker.wrote_recently(user.id + 1)
+
+# Test that the change feed replays from Last-Event-ID and streams live writes
+def test_item_change_feed(client, fakedb, monkeypatch):
+    import threading
+    import time
+    from app.items import changes
+
+    monkeypatch.setattr(changes, "CHANGES_STREAM_MAX_SECONDS", 1)
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def events(body):
+        return [
+            dict(line.split(": ", 1) for line in block.splitlines())
+            for block in body.split("\n\n") if block.startswith("id: ")
+        ]
+
+    streamed = {}
+    listener = threading.Thread(
+        target=lambda: streamed.update(body=client.get("/items/changes", headers=headers).text)
+    )
+    listener.start()
+    time.sleep(0.3)
+    item = client.post("/items/", json={"name": "Fed", "price": 2.0}, headers=headers).json()
+    listener.join()
+    live = events(streamed["body"])
+    assert [(event["event"], event["data"]) for event in live] == [("create", f'{{"item_id": {item["id"]}, "op": "create"}}')]
+
+    client.put(f"/items/{item['id']}", json={"name": "Fed", "price": 3.0}, headers=headers)
+    client.delete(f"/items/{item['id']}", headers=headers)
+    replayed = events(client.get("/items/changes", headers={**headers, "Last-Event-ID": live[0]["id"]}).text)
+    assert [event["event"] for event in replayed] == ["update", "delete"]
+
+    # A reset carries the newest id, so resuming from it does not reset again.
+    monkeypatch.setattr(changes, "CHANGES_REPLAY_LIMIT", 1)
+    reset = events(client.get("/items/changes", headers={**headers, "Last-Event-ID": "0"}).text)
+    assert [event["event"] for event in reset] == ["reset"]
+    assert reset[0]["id"] == replayed[-1]["id"]
+    resumed = client.get("/items/changes", headers={**headers, "Last-Event-ID": reset[0]["id"]}).text
+    assert "event: reset" not in resumed
+
+# Test that identical concurrent reads share one query until the user writes
+def test_single_flight_coalesces_reads():
+    import asyncio
+    from app.items.single_flight import SingleFlight, single_flight_requests
+
+    flight = SingleFlight()
+    calls = []
+
+    async def query():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"rows": len(calls)}
+
+    async def read_concurrently():
+        key = flight.key("read_items", 1, {"limit": 10})
+        return await asyncio.gather(*[flight.do(key, query) for _ in range(5)])
+
+    coalesced_before = single_flight_requests.value(endpoint="read_items", result="coalesced")
+    assert asyncio.run(read_concurrently()) == [{"rows": 1}] * 5
+    assert single_flight_requests.value(endpoint="read_items", result="coalesced") - coalesced_before == 4
+
+    key = flight.key("read_items", 1, {"limit": 10})
+    flight.invalidate(1)
+    assert flight.key("read_items", 1, {"limit": 10}) != key
+
+# Test price-filtered listings served from the in-memory price index
+def test_price_index_listing(client, fakedb, monkeypatch):
+    from sqlalchemy import delete
+    from app.items import items_logic, price_index, schemas
+    from app.items.models import Item
+
+    monkeypatch.setattr(price_index, "PRICE_INDEX_ENABLED", True)
+    price_index.price_index.clear()
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    ids = [
+        client.post("/items/", json={"name": "Indexed", "price": price}, headers=headers).json()["id"]
+        for price in [30.0, 10.0, 20.0, 10.0, 50.0, 40.0, 25.0]
+    ]
+    prices = dict(zip(ids, [30.0, 10.0, 20.0, 10.0, 50.0, 40.0, 25.0]))
+
+    def listing(sort):
+        seen = []
+        url = f"/items/?sort={sort}&limit=2&min_price=10&max_price=40"
+        while url:
+            response = client.get(url, headers=headers)
+            assert response.status_code == status.HTTP_200_OK
+            seen.extend(item["id"] for item in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            url = f"/items/?limit=2&min_price=10&max_price=40&cursor={cursor}" if cursor else None
+        return seen
+
+    def expected(sort):
+        matching = [item_id for item_id, price in prices.items() if 10 <= price <= 40]
+        return sorted(matching, key=(lambda i: (prices[i], i)) if sort == "price" else None)
+
+    assert listing("price") == expected("price")
+    assert listing("id") == expected("id")
+    loads = price_index.index_lookups.value(result="load")
+
+    client.put(f"/items/{ids[0]}", json={"name": "Indexed", "price": 15.0}, headers=headers)
+    client.delete(f"/items/{ids[1]}", headers=headers)
+    prices[ids[0]] = 15.0
+    del prices[ids[1]]
+    assert listing("price") == expected("price")
+    assert listing("id") == expected("id")
+    # Local writes were folded into the loaded entry rather than reloading it.
+    assert price_index.index_lookups.value(result="load") == loads
+
+    # skip is applied within the indexed range.
+    page = client.get("/items/?sort=price&min_price=10&max_price=40&skip=2&limit=2", headers=headers).json()
+    assert [item["id"] for item in page] == expected("price")[2:4]
+    page = client.get("/items/?sort=id&min_price=10&max_price=40&skip=1&limit=2", headers=headers).json()
+    assert [item["id"] for item in page] == expected("id")[1:3]
+
+    # A write on another worker leaves a version gap: the entry reloads.
+    monkeypatch.setattr(items_logic, "change_listeners", [])
+    items_logic.update_item(fakedb, ids[2], schemas.ItemUpdate(name="Indexed", price=35.0), user.id)
+    prices[ids[2]] = 35.0
+    assert listing("price") == expected("price")
+    assert price_index.index_lookups.value(result="load") == loads + 1
+
+    # A row deleted after the entry was read is not silently dropped from the page.
+    fakedb.execute(delete(Item).where(Item.id == ids[3]))
+    fakedb.commit()
+    del prices[ids[3]]
+    version = items_logic.get_collection_version(fakedb, user.id)
+    page, next_cursor = price_index.get_items_page(
+        fakedb, user.id, version, limit=2, sort="price", fields=("id",), min_price=10, max_price=40
+    )
+    assert [row.id for row in page] == expected("price")[:2]
+    assert next_cursor is not None
+
+    # A price-sorted cursor positioned on an item without a price still pages.
+    unpriced = create_test_item(fakedb, user_id=user.id, name="Indexed", price=None)
+    cursor = items_logic.encode_cursor("price", unpriced)
+    response = client.get(f"/items/?limit=10&min_price=10&max_price=40&cursor={cursor}", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["id"] for item in response.json()] == expected("price")
+
+    # Least recently used entries go first, the others stay (users without items: 200 bytes each).
+    index = price_index.PriceIndex(max_bytes=450)
+    for user_id in (user.id + 1, user.id + 2, user.id + 1, user.id + 3):
+        index.lookup(fakedb, user_id, 0)
+    assert list(index._entries) == [user.id + 1, user.id + 3]
+    assert index._bytes <= index.max_bytes
+
+# Test paging by price past items without a price
+def test_cursor_pagination_null_prices(client, fakedb):
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    for price in [None, 5.0, None]:
+        create_test_item(fakedb, user_id=user.id, name="Unpriced", price=price)
+
+    seen = []
+    url = "/items/?sort=price&limit=1&query=Unpriced"
+    while url:
+        response = client.get(url, headers=headers)
+        seen.extend(item["price"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        url = f"/items/?limit=1&query=Unpriced&cursor={cursor}" if cursor else None
+
+    assert seen == [None, None, 5.0]
+
+# Test that import jobs are kept in the database, IMPORT_JOB_HISTORY at most
+def test_import_job_registry(fakedb):
+    import time
+    from app.items import importer
+
+    user = create_test_user(fakedb)
+    registry = importer.JobRegistry(history=2)
+    created = [
+        registry.add(fakedb, importer.ImportJob(user_id=user.id, format="csv", created_at=time.time() + i))
+        for i in range(3)
+    ]
+    created[2].status, created[2].errors = "failed", [{"line": None, "error": "boom"}]
+    registry.save(fakedb, created[2])
+
+    assert registry.get(fakedb, created[0].id) is None
+    assert registry.get(fakedb, created[1].id).status == "queued"
+    assert registry.get(fakedb, created[2].id).errors == [{"line": None, "error": "boom"}]
+
+# Test that an item ETag is not reused when SQLite reuses a deleted item's id
+def test_item_etag_survives_id_reuse(client, fakedb):
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    item = client.post("/items/", json={"name": "Old", "price": 1.0}, headers=headers).json()
+    etag = client.get(f"/items/{item['id']}", headers=headers).headers["ETag"]
+    client.delete(f"/items/{item['id']}", headers=headers)
+
+    reused = client.post("/items/", json={"name": "New", "price": 2.0}, headers=headers).json()
+    assert reused["id"] == item["id"]
+    response = client.get(f"/items/{item['id']}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["name"] == "New"
+
+# Test that a listing started before a write is not shared with requests made after it
+def test_single_flight_listing_respects_writes(client, fakedb, monkeypatch):
+    import asyncio
+    import time
+    import httpx
+    from app.items import items_logic, price_index, schemas
+
+    user = create_test_user(fakedb)
+    token = client.post("/token", data={"username": user.username, "password": "password"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.post("/items/", json={"name": "Flight", "price": 1.0}, headers=headers)
+
+    get_items_page = price_index.get_items_page
+
+    def slow_items_page(*args, **kwargs):
+        page = get_items_page(*args, **kwargs)
+        time.sleep(0.3)
+        return page
+
+    monkeypatch.setattr(price_index, "get_items_page", slow_items_page)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=client.app), base_url="http://test") as http:
+            first = asyncio.create_task(http.get("/items/?query=Flight", headers=headers))
+            await asyncio.sleep(0.15)
+            # Committed where no listener of this process hears about it, as on another worker.
+            monkeypatch.setattr(items_logic, "write_listeners", [])
+            items_logic.create_item(fakedb, schemas.ItemCreate(name="Flight too", price=2.0), user.id)
+            second = await http.get("/items/?query=Flight", headers=headers)
+            return await first, second
+
+    first, second = asyncio.run(scenario())
+    assert len(first.json()) == 1
+    assert len(second.json()) == 2
+    assert second.headers["ETag"] != first.headers["ETag"]
+    client.request("DELETE", "/items/bulk", json={"ids": [item["id"] for item in second.json()]}, headers=headers)
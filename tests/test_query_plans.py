@@ -0,0 +1,60 @@
+import pytest
+
+from app.items import items_logic, schemas
+from tests.query_plan import capture_statements, full_table_scans
+from tests.utils import create_test_user, create_test_item
+
+LISTING_SHAPES = [
+    {},
+    {"min_price": 10},
+    {"max_price": 10},
+    {"min_price": 10, "max_price": 20},
+    {"query": "item"},
+    {"query": "item", "sort": "rank"},
+    {"query": "%", "min_price": 10},
+    {"sort": "price"},
+    {"sort": "price", "min_price": 10, "max_price": 20},
+    {"skip": 5, "limit": 5},
+]
+
+
+@pytest.fixture(scope="module")
+def owner(fakedb):
+    user = create_test_user(fakedb)
+    for i in range(20):
+        create_test_item(fakedb, user_id=user.id, name=f"Item {i}", price=float(i))
+    return user
+
+
+def explain_all(fakedb, call):
+    engine = fakedb.get_bind()
+    with capture_statements(engine) as statements:
+        call()
+    assert statements
+    return {statement: full_table_scans(engine, statement, params) for statement, params in statements}
+
+
+@pytest.mark.parametrize("shape", LISTING_SHAPES)
+def test_listing_query_plans_use_indexes(fakedb, owner, shape):
+    plans = explain_all(fakedb, lambda: items_logic.get_items(fakedb, user_id=owner.id, **shape))
+    assert not any(plans.values()), plans
+
+
+@pytest.mark.parametrize("sort", ["id", "price"])
+def test_cursor_query_plans_use_indexes(fakedb, owner, sort):
+    _, cursor = items_logic.get_items_page(fakedb, user_id=owner.id, limit=3, sort=sort)
+    plans = explain_all(
+        fakedb, lambda: items_logic.get_items_page(fakedb, user_id=owner.id, limit=3, cursor=cursor)
+    )
+    assert not any(plans.values()), plans
+
+
+def test_write_query_plans_use_indexes(fakedb, owner):
+    def writes():
+        item = items_logic.create_item(fakedb, schemas.ItemCreate(name="Planned", price=1.0), owner.id)
+        items_logic.get_item(fakedb, item.id, owner.id)
+        items_logic.update_item(fakedb, item.id, schemas.ItemUpdate(name="Planned", price=2.0), owner.id)
+        items_logic.delete_item(fakedb, item.id, owner.id)
+
+    plans = explain_all(fakedb, writes)
+    assert not any(plans.values()), plans
@@ -1,3 +1,5 @@
+import time
+
 from app.auth.utils import get_password_hash
 from app.auth.models import User
 from sqlalchemy.orm import Session
@@ -38,3 +40,29 @@ def create_test_items(db, user_id):
         item = Item(user_id=user_id, **item_data)
         db.add(item)
     db.commit()
+
+
+class FakeRedis:
+    """Stand-in for a shared redis client: the subset of its API the cache backends use."""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, name):
+        value, expires_at = self.store.get(name, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.store.pop(name, None)
+            return None
+        return value
+
+    def set(self, name, value, px=None):
+        expires_at = time.monotonic() + px / 1000 if px else None
+        self.store[name] = (value.encode() if isinstance(value, str) else value, expires_at)
+
+    def delete(self, *names):
+        for name in names:
+            self.store.pop(name, None)
+
+    def scan_iter(self, match="*"):
+        prefix = match.rstrip("*")
+        return [name for name in list(self.store) if name.startswith(prefix)]